@@ -1,14 +1,19 @@
 import requests
 import json
 import os
+import transport
 
-def fetch_data(keyword: str, num_products: int):
+# "<provinceId>:<storeId>" of the Bach Hoa Xanh branch to price against
+DEFAULT_LOCATION = "1027:2546"
+
+def fetch_data(keyword: str, num_products: int, location: str = None):
     url = "https://api.bachhoaxanh.com/gw/search/v2/DataSearch"
+    province_id, store_id = (location or DEFAULT_LOCATION).split(':')
 
     payload = {
         "keywords": keyword,
-        "provinceId": 1027,
-        "storeId": 2546,
+        "provinceId": int(province_id),
+        "storeId": int(store_id),
         "pageIndex": 0,
         "pageSize": num_products,
         "sortStr": None
@@ -39,7 +44,7 @@ def fetch_data(keyword: str, num_products: int):
     }
 
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        response = transport.post(url, json=payload, headers=headers)
         response.raise_for_status()
         response_data = response.json()
         results = []
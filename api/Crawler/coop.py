@@ -1,6 +1,7 @@
 import requests
 import json
 import os
+import transport
 
 def fetch_data(keyword: str, num_products: int):
     url = "https://discovery.tekoapis.com/api/v2/search-skus-v2"
@@ -24,7 +25,7 @@ def fetch_data(keyword: str, num_products: int):
     }
 
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        response = transport.post(url, json=payload, headers=headers)
         response.raise_for_status()
         response = response.json()
         results = []
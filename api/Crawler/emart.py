@@ -1,11 +1,9 @@
-import requests
 import json
 from bs4 import BeautifulSoup
+import transport
 
-def crawl(keyword: str, num_products: int) -> str:
-    url = f'https://emartmall.com.vn/index.php?search={keyword}&submit_search=&route=product%2Fsearch&sub_category=true&description=true&search_category_id=&search_store_id=0&search_type=recent_search'
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+def parse(html: str):
+    soup = BeautifulSoup(html, 'html.parser')
     products = soup.find_all('div', class_='product-block desktop-pdt')
     results = []
 
@@ -25,7 +23,11 @@ def crawl(keyword: str, num_products: int) -> str:
             'unit': None
         }
         results.append(product)
-    return results[:num_products]
+    return results
+
+def crawl(keyword: str, num_products: int) -> str:
+    url = f'https://emartmall.com.vn/index.php?search={keyword}&submit_search=&route=product%2Fsearch&sub_category=true&description=true&search_category_id=&search_store_id=0&search_type=recent_search'
+    return transport.get_cached(url, parse)[:num_products]
 
 if __name__ == "__main__":
     products = crawl("đậu hà lan đà lạt", 5)
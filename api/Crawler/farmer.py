@@ -1,11 +1,9 @@
-import requests
 import json
 from bs4 import BeautifulSoup
+import transport
 
-def crawl(keyword: str, num_products: int) -> str:
-    url = f'https://farmersmarket.vn/search?type=product&q=filter=((title%3Aproduct%20contains%20{keyword})%7C%7C(sku%3Aproduct%20contains%20{keyword}))'
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+def parse(html: str):
+    soup = BeautifulSoup(html, 'html.parser')
     result = soup.find('div', class_='search-list-results')
     if result is None:
         return []
@@ -27,7 +25,11 @@ def crawl(keyword: str, num_products: int) -> str:
             'unit': None
         }
         results.append(product)
-    return results[:num_products]
+    return results
+
+def crawl(keyword: str, num_products: int) -> str:
+    url = f'https://farmersmarket.vn/search?type=product&q=filter=((title%3Aproduct%20contains%20{keyword})%7C%7C(sku%3Aproduct%20contains%20{keyword}))'
+    return transport.get_cached(url, parse)[:num_products]
 
 if __name__ == "__main__":
     products = crawl("sữa chua", 5)
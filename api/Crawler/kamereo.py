@@ -1,28 +1,28 @@
-import requests
 import json
 import os
+import transport
 
-def fetch_data(keyword: str, num_products: int):
-    url = "https://buyer-graphql.prod.kamereo.vn/"
+# Kamereo region code, sent both as a filter and in the x-customheader header
+DEFAULT_LOCATION = "HCM"
 
-    headers = {
-        'Connection': 'keep-alive',
-        'Origin': 'https://kamereo.vn',
-        'Referer': 'https://kamereo.vn/',
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/144.0.0.0 Safari/537.36',
-        'accept': '*/*',
-        'accept-language': 'vi',
-        'content-type': 'application/json',
-        'sec-ch-ua': '"Not(A:Brand";v="8", "Chromium";v="144", "Google Chrome";v="144"',
-        'sec-ch-ua-mobile': '?0',
-        'sec-ch-ua-platform': '"Windows"',
-        'x-client-appname': 'BuyerWeb',
-        'x-client-version': '3.8.1',
-        'x-customheader': 'HCM',
-        'x-timezone': 'Asia/Bangkok'
-    }
+# Static request parts are built once at import rather than on every search
+HEADERS = {
+    'Connection': 'keep-alive',
+    'Origin': 'https://kamereo.vn',
+    'Referer': 'https://kamereo.vn/',
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/144.0.0.0 Safari/537.36',
+    'accept': '*/*',
+    'accept-language': 'vi',
+    'content-type': 'application/json',
+    'sec-ch-ua': '"Not(A:Brand";v="8", "Chromium";v="144", "Google Chrome";v="144"',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-platform': '"Windows"',
+    'x-client-appname': 'BuyerWeb',
+    'x-client-version': '3.8.1',
+    'x-timezone': 'Asia/Bangkok'
+}
 
-    query_graphql = """query productSearch($sort: [ProductSort!]!, $filter: ProductFilter, $pagination: Pagination!, $isBoostKamereoProducts: Boolean, $isBoostSameProductGroups: Boolean, $aggregationOptions: AggregationOptions) {
+QUERY_GRAPHQL = """query productSearch($sort: [ProductSort!]!, $filter: ProductFilter, $pagination: Pagination!, $isBoostKamereoProducts: Boolean, $isBoostSameProductGroups: Boolean, $aggregationOptions: AggregationOptions) {
   productSearch(
     sort: $sort
     filter: $filter
@@ -53,73 +53,107 @@ def fetch_data(keyword: str, num_products: int):
 }
 """
 
+# Branch-specific fields only, used when the catalog rows are already known from another region
+PRICE_QUERY_GRAPHQL = """query productSearch($sort: [ProductSort!]!, $filter: ProductFilter, $pagination: Pagination!) {
+  productSearch(sort: $sort, filter: $filter, pagination: $pagination) {
+    data {
+      id
+      price
+      originalPrice
+      inStock
+      priceV2 {
+        price
+        originalPrice
+      }
+    }
+  }
+}
+"""
+
+AGGREGATION_OPTIONS = {
+    "includeOrigins": True,
+    "includeBrands": True,
+    "includeCategoriesAndSubCategories": True
+}
+
+def search(keyword: str, num_products: int, query: str, location: str, **extra_variables):
+    url = "https://buyer-graphql.prod.kamereo.vn/"
+
     payload = {
         "operationName": "productSearch",
         "variables": {
             "sort": [],
             "filter": {
                 "query": keyword,
-                "regionCode": "HCM"
+                "regionCode": location
             },
             "pagination": {
                 "page": 0,
                 "size": num_products
             },
-            "aggregationOptions": {
-                "includeOrigins": True,
-                "includeBrands": True,
-                "includeCategoriesAndSubCategories": True
-            }
+            **extra_variables
         },
-        "query": query_graphql
+        "query": query
+    }
+
+    response = transport.post(url, headers={**HEADERS, 'x-customheader': location}, json=payload)
+    response.raise_for_status()
+    data = response.json()
+    return data.get('data', {}).get('productSearch', {}).get('data', []) or []
+
+def price_fields(product: dict):
+    # Handle priceV2 if available, otherwise fallback
+    price_info = product.get('priceV2') or {}
+
+    # Use priceV2 price if available, else root price
+    current_price = price_info.get('price')
+    if current_price is None:
+        current_price = product.get('price', 0)
+
+    original_price = price_info.get('originalPrice')
+    if original_price is None:
+        original_price = product.get('originalPrice', 0)
+
+    if original_price == 0:
+        original_price = current_price
+
+    discount_price = current_price if current_price < original_price else None
+
+    return {
+        'url': f"https://kamereo.vn/product/{product.get('id')}",
+        'discountPrice': discount_price,
+        'originalPrice': original_price,
+        # Kamereo only reports availability per branch, not a stock count
+        'quantity': 1 if product.get('inStock', True) else 0,
     }
 
+def fetch_data(keyword: str, num_products: int, location: str = None):
     try:
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()
-        data = response.json()
-        
         results = []
-        products = data.get('data', {}).get('productSearch', {}).get('data', [])
-        
-        if not products:
-            return []
-
-        for product in products:
-            # Handle priceV2 if available, otherwise fallback
-            price_info = product.get('priceV2') or {}
-            
-            # Use priceV2 price if available, else root price
-            current_price = price_info.get('price')
-            if current_price is None:
-                current_price = product.get('price', 0)
-                
-            original_price = price_info.get('originalPrice')
-            if original_price is None:
-                original_price = product.get('originalPrice', 0)
-                
-            if original_price == 0:
-                original_price = current_price
-
-            discount_price = current_price if current_price < original_price else None
-
+        for product in search(keyword, num_products, QUERY_GRAPHQL, location or DEFAULT_LOCATION,
+                              aggregationOptions=AGGREGATION_OPTIONS):
             # Construct product object
             item = {
                 'image_url': product.get('imageUrl'),
-                'url': f"https://kamereo.vn/product/{product.get('id')}", 
                 'name': product.get('name'),
-                'discountPrice': discount_price,
-                'originalPrice': original_price,
                 'unit': product.get('uomLocal') or product.get('uom'),
-                'quantity': 1,
+                **price_fields(product)
             }
             results.append(item)
-            
+
         return results
 
     except Exception as e:
         print(f"Error fetching data: {e}")
-        return []
+        return None
+
+def fetch_prices(keyword: str, num_products: int, location: str):
+    try:
+        return [price_fields(product) for product in search(keyword, num_products, PRICE_QUERY_GRAPHQL, location)]
+
+    except Exception as e:
+        print(f"Error fetching data: {e}")
+        return None
 
 if __name__ == "__main__":
     # save the json to a file in the same directory as the script
@@ -1,20 +1,10 @@
 import requests
 import json
 import os
+import transport
 
-def fetch_data(keyword: str, num_products: int = 5):
-    url = "https://onelife-api.kingfoodmart.com/v1/gateway/"
-
-    payload = {
-        "operationName": "Search",
-        "variables": {
-            "type": None,
-            "target": "PRODUCT",
-            "first": num_products,
-            "keyword": keyword,
-            "after": None
-        },
-        "query": """query Search($type: [SearchType], $keyword: String, $first: Int, $target: SearchTarget, $after: Cursor) {
+# Static request parts are built once at import rather than on every search
+SEARCH_QUERY = """query Search($type: [SearchType], $keyword: String, $first: Int, $target: SearchTarget, $after: Cursor) {
   search(
     type: $type
     keyword: $keyword
@@ -44,15 +34,29 @@ def fetch_data(keyword: str, num_products: int = 5):
     }
   }
 }"""
-    }
 
-    headers = {
-        'Content-Type': 'application/json',
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+HEADERS = {
+    'Content-Type': 'application/json',
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+def fetch_data(keyword: str, num_products: int = 5):
+    url = "https://onelife-api.kingfoodmart.com/v1/gateway/"
+
+    payload = {
+        "operationName": "Search",
+        "variables": {
+            "type": None,
+            "target": "PRODUCT",
+            "first": num_products,
+            "keyword": keyword,
+            "after": None
+        },
+        "query": SEARCH_QUERY
     }
 
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        response = transport.post(url, json=payload, headers=HEADERS)
         response.raise_for_status()
         
         data = response.json()
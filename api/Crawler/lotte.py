@@ -1,22 +1,30 @@
 import requests
 import json
 import os
+import transport
 
-def fetch_data(keyword: str, num_products: int):
-    url = "https://www.lottemart.vn/v1/p/mart/es/vi_nsg/products/search"
+# Lotte Mart branch code, e.g. vi_nsg (Nam Sai Gon); it appears in the API path and product URLs
+DEFAULT_LOCATION = "vi_nsg"
+
+CATALOG_FIELDS = [
+    "id", "sku", "name", "label", "price", "url_key", "image_url",
+    "in_stock", "promotion", "stock_qty", "type_id",
+    "custom_attribute.bundle_type", "ext_overall_rating",
+    "ext_overall_review", "short_description", "bundle_options",
+    "child_price", "child_stock", "configurable_options",
+    "configurable_children", "custom_attribute"
+]
+# Branch-specific fields only, used when the catalog rows are already known from another branch
+PRICE_FIELDS = ["url_key", "price", "in_stock", "stock_qty"]
+
+def search(keyword: str, fields: list, location: str):
+    url = f"https://www.lottemart.vn/v1/p/mart/es/{location}/products/search"
 
     payload = {
         "limit": 20,
         "offset": 1,
         "facet_filters": {},
-        "fields": [
-            "id", "sku", "name", "label", "price", "url_key", "image_url",
-            "in_stock", "promotion", "stock_qty", "type_id",
-            "custom_attribute.bundle_type", "ext_overall_rating",
-            "ext_overall_review", "short_description", "bundle_options",
-            "child_price", "child_stock", "configurable_options",
-            "configurable_children", "custom_attribute"
-        ],
+        "fields": fields,
         "where": {
             "query": keyword
         }
@@ -27,41 +35,51 @@ def fetch_data(keyword: str, num_products: int):
         'accept-language': 'en-US,en;q=0.9,vi-VN;q=0.8,vi;q=0.7',
         'content-type': 'application/json',
         'origin': 'https://www.lottemart.vn',
-        'referer': 'https://www.lottemart.vn/vi-nsg/category',
+        'referer': f"https://www.lottemart.vn/{location.replace('_', '-')}/category",
         'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36',
     }
 
+    response = transport.post(url, json=payload, headers=headers)
+    response.raise_for_status()
+    return response.json()['data']['items'] or []
+
+def price_fields(item: dict, location: str):
+    defaultPrice = item['price']['VND']['default']
+    price = item['price']['VND']['price']
+    return {
+        "id": item.get('url_key'),
+        "url": f"https://www.lottemart.vn/{location.replace('_', '-')}/product/" + item.get('url_key'),
+        "discountPrice": defaultPrice if defaultPrice != price else None,
+        "originalPrice": price,
+        "quantity": item.get('stock_qty')
+    }
+
+def fetch_data(keyword: str, num_products: int, location: str = None):
+    location = location or DEFAULT_LOCATION
     try:
-        response = requests.post(url, json=payload, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        
+        items = search(keyword, CATALOG_FIELDS, location)
+
         # Transform data
         products = []
+        for item in items[0:num_products]:
+            product = {
+                "image_url": item.get('image_url'),
+                "name": item.get('name'),
+                "unit": item['custom_attribute']['unit'],
+                **price_fields(item, location)
+            }
+            products.append(product)
 
-        if (data['data']['items'] is not None):
-            for item in data['data']['items'][0:num_products]:
-                image_url = item.get('image_url')
-                url = "https://www.lottemart.vn/vi-nsg/product/" + item.get('url_key')
-                name = item.get('name')
-                defaultPrice = item['price']['VND']['default']
-                price = item['price']['VND']['price']
-                unit = item['custom_attribute']['unit']
-                quantity = item.get('stock_qty')
+        return products
 
-                product = {
-                    "image_url": image_url,
-                    "url": url,
-                    "name": name,
-                    "discountPrice": defaultPrice if defaultPrice != price else None,
-                    "originalPrice": price,
-                    "unit": unit,
-                    "quantity": quantity
-                }
-                
-                products.append(product)
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching data: {e}")
+        return None
 
-        return products
+def fetch_prices(keyword: str, num_products: int, location: str):
+    try:
+        items = search(keyword, PRICE_FIELDS, location)
+        return [price_fields(item, location) for item in items[0:num_products]]
 
     except requests.exceptions.RequestException as e:
         print(f"Error fetching data: {e}")
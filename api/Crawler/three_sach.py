@@ -1,11 +1,9 @@
-import requests
 import json
 from bs4 import BeautifulSoup
+import transport
 
-def crawl(keyword: str, num_products: int) -> str:
-    url = f'https://3sach.vn/search?type=product&q={keyword}'
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+def parse(html: str):
+    soup = BeautifulSoup(html, 'html.parser')
     products = soup.find_all('div', class_='col-md-2 col-sm-4 col-xs-4 product-loop')
     results = []
 
@@ -25,7 +23,11 @@ def crawl(keyword: str, num_products: int) -> str:
             'unit': None
         }
         results.append(product)
-    return results[:num_products]
+    return results
+
+def crawl(keyword: str, num_products: int) -> str:
+    url = f'https://3sach.vn/search?type=product&q={keyword}'
+    return transport.get_cached(url, parse)[:num_products]
 
 if __name__ == "__main__":
     products = crawl("đậu hà lan đà lạt", 5)
@@ -0,0 +1,170 @@
+import http.cookiejar
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Shared session so crawlers reuse pooled keep-alive connections to each store host
+session = requests.Session()
+session.mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=32))
+session.mount('http://', HTTPAdapter(pool_connections=16, pool_maxsize=32))
+# Never store or send cookies: the session is shared by every crawler, branch and the image
+# proxy, so a store's Set-Cookie (e.g. a selected branch) must not leak into other requests
+session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+
+CACHE_MAX_ENTRIES = 256
+
+# (connect, read) seconds for every store request, so a hung store cannot hold a worker forever
+TIMEOUT = (float(os.environ.get('CRAWLER_CONNECT_TIMEOUT', '5')), float(os.environ.get('CRAWLER_READ_TIMEOUT', '15')))
+
+
+def resolve(url: str) -> str:
+    # CRAWLER_UPSTREAM=http://127.0.0.1:9100 sends every store request to a local stand-in
+    # (see loadtest/mock_stores.py) as http://127.0.0.1:9100/<store host>/<path>?<query>
+    upstream = os.environ.get('CRAWLER_UPSTREAM', '').rstrip('/')
+    if not upstream:
+        return url
+    parts = urlsplit(url)
+    return f"{upstream}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else '')
+
+
+def warm_connection(host: str, timeout: float = 5.0):
+    # Resolve DNS and open a pooled (TLS) connection to `host` so the first search skips both
+    url = resolve(f'https://{host}/')
+    parts = urlsplit(url)
+    socket.getaddrinfo(parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+    # The body-less response is fully read, so the connection goes back to the pool still open
+    return session.head(url, timeout=timeout, allow_redirects=False).status_code
+
+
+def get(url: str, **kwargs):
+    kwargs.setdefault('timeout', TIMEOUT)
+    return session.get(resolve(url), **kwargs)
+
+
+def post(url: str, **kwargs):
+    kwargs.setdefault('timeout', TIMEOUT)
+    return session.post(resolve(url), **kwargs)
+
+
+def _parse_cache_control(value: str) -> dict:
+    directives = {}
+    for part in (value or '').split(','):
+        part = part.strip().lower()
+        if not part:
+            continue
+        key, _, arg = part.partition('=')
+        directives[key.strip()] = arg.strip().strip('"')
+    return directives
+
+
+def _freshness_lifetime(headers) -> float:
+    # Seconds the response may be served without revalidation. We act as a shared cache,
+    # but crawler requests carry no cookies, so `private` responses are still stored.
+    cc = _parse_cache_control(headers.get('Cache-Control'))
+    if 'no-cache' in cc:
+        return 0
+    for key in ('s-maxage', 'max-age'):
+        if cc.get(key, '').isdigit():
+            return int(cc[key])
+    expires = headers.get('Expires')
+    if expires:
+        try:
+            return max(0.0, parsedate_to_datetime(expires).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+
+class HttpCache:
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.stats = {'fresh_hits': 0, 'revalidated': 0, 'misses': 0}
+
+    def lookup(self, url: str):
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is not None:
+                self.entries.move_to_end(url)
+            return entry
+
+    def store(self, url: str, entry: dict):
+        with self.lock:
+            self.entries[url] = entry
+            self.entries.move_to_end(url)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def count(self, key: str):
+        with self.lock:
+            self.stats[key] += 1
+
+
+cache = HttpCache()
+
+
+def _parsed(entry: dict, parse):
+    # Parsed results are keyed by the response validator, so a 304 skips the parse too
+    key = (getattr(parse, '__module__', ''), getattr(parse, '__qualname__', repr(parse)), entry['validator'])
+    if key not in entry['parsed']:
+        entry['parsed'][key] = parse(entry['text'])
+    return entry['parsed'][key]
+
+
+def get_cached(url: str, parse, headers: dict = None, timeout: float = None):
+    # GET `url` through the HTTP cache and return `parse(response.text)`. Fresh entries are
+    # served as-is; stale ones are revalidated with If-None-Match / If-Modified-Since.
+    entry = cache.lookup(url)
+    if entry is not None and time.monotonic() < entry['fresh_until']:
+        cache.count('fresh_hits')
+        return _parsed(entry, parse)
+
+    request_headers = dict(headers or {})
+    if entry is not None:
+        if entry['etag']:
+            request_headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            request_headers['If-Modified-Since'] = entry['last_modified']
+
+    response = get(url, headers=request_headers, timeout=timeout or TIMEOUT)
+
+    if response.status_code == 304 and entry is not None:
+        cache.count('revalidated')
+        entry['fresh_until'] = time.monotonic() + _freshness_lifetime(response.headers)
+        cache.store(url, entry)
+        return _parsed(entry, parse)
+
+    cache.count('misses')
+    if response.status_code != 200:
+        # Store errors must reach the caller (jobs and batch runs retry them), not parse to []
+        response.raise_for_status()
+        return parse(response.text)
+
+    cc = _parse_cache_control(response.headers.get('Cache-Control'))
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    lifetime = _freshness_lifetime(response.headers)
+    entry = {
+        'text': response.text,
+        'etag': etag,
+        'last_modified': last_modified,
+        'validator': etag or last_modified or str(time.monotonic()),
+        'fresh_until': time.monotonic() + lifetime,
+        'parsed': {},
+    }
+    if 'no-store' not in cc and (etag or last_modified or lifetime > 0):
+        cache.store(url, entry)
+    return _parsed(entry, parse)
+
+
+def get_cache_stats():
+    with cache.lock:
+        return {**cache.stats, 'entries': len(cache.entries)}
@@ -1,8 +1,11 @@
-import requests
 import json
 import os
+import transport
 
-def fetch_data(keyword: str, num_products: int):
+# WinMart store number to price against
+DEFAULT_LOCATION = "1535"
+
+def fetch_data(keyword: str, num_products: int, location: str = None):
     url = "https://api-crownx.winmart.vn/ss/api/v2/public/winmart/item-search"
 
     headers = {
@@ -25,14 +28,14 @@ def fetch_data(keyword: str, num_products: int):
     payload = {
         "keyword": keyword,
         "pageNumber": 1,
-        "storeNo": "1535",
+        "storeNo": location or DEFAULT_LOCATION,
         "storeGroupCode": "1998",
         "pageSize": num_products,
         "applicationType": "Winmart"
     }
 
     try:
-        response = requests.post(url, headers=headers, json=payload)
+        response = transport.post(url, headers=headers, json=payload)
         response.raise_for_status()
         data = response.json()
         
@@ -68,7 +71,7 @@ def fetch_data(keyword: str, num_products: int):
 
     except Exception as e:
         print(f"Error fetching data: {e}")
-        return []
+        return None
 
 if __name__ == "__main__":
     # save the json to a file in the same directory as the script
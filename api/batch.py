@@ -0,0 +1,219 @@
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+import time
+
+import bulkhead
+import columnar
+import getData
+
+# Offline batch crawler for nightly price snapshots:
+#   python api/batch.py keywords.txt -o snapshot.jsonl --concurrency 8
+#   python api/batch.py keywords.txt -o snapshot.parquet --sources Lottemart,KingFoodmart
+# Keywords are read lazily (one per line) and every (keyword, source) crawl streams its
+# normalized Product rows to the output as soon as it finishes, so memory stays flat.
+# Crawls whose rows are on disk are appended to a checkpoint file; re-running the same command
+# skips them. Parquet output is a set of part files <stem>-<run>-<n>.parquet (see ParquetWriter).
+# Failed crawls are not checkpointed, so the next run retries them.
+# Rows of a crawl that was writing when the process died may appear twice (at-least-once).
+
+COLUMNS = [
+    ('keyword', 'string'),
+    ('source', 'string'),
+    ('location', 'string'),
+    ('name', 'string'),
+    ('url', 'string'),
+    ('image_url', 'string'),
+    ('discountPrice', 'int64'),
+    ('originalPrice', 'int64'),
+    ('unit', 'string'),
+    ('quantity', 'float64'),
+    ('unitPrice', 'float64'),
+    ('canonicalUnit', 'string'),
+    ('crawled_at', 'float64'),
+]
+
+
+class JsonlWriter:
+    # Every write is flushed, so its unit can be checkpointed right away
+    def __init__(self, path: str, resume: bool, checkpoint):
+        self.file = open(path, 'a' if resume else 'w', encoding='utf-8')
+        self.checkpoint = checkpoint
+
+    def write(self, unit, rows: list):
+        for row in rows:
+            self.file.write(json.dumps(row, ensure_ascii=False))
+            self.file.write('\n')
+        self.file.flush()
+        self.checkpoint.mark(unit)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    # Buffers at most `row_group_size` rows, then writes them out as a complete Parquet part
+    # <stem>-<run>-<n><ext>. A crash can only lose the part being written, and the units in it
+    # are checkpointed once it is in place, so they are crawled again on the next run.
+    # Read the parts together with pyarrow.dataset.dataset(glob.glob('<stem>-*<ext>')).
+    def __init__(self, path: str, resume: bool, row_group_size: int, checkpoint):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("Parquet output needs pyarrow: pip install pyarrow")
+        self.pa = pa
+        self.pq = pq
+        self.schema = pa.schema([(name, getattr(pa, kind)()) for name, kind in COLUMNS])
+        self.stem, self.ext = os.path.splitext(path)
+        if not resume:
+            for part in glob.glob(f"{glob.escape(self.stem)}-*-*{glob.escape(self.ext)}"):
+                os.remove(part)
+        self.run_id = int(time.time())
+        self.parts = 0
+        self.row_group_size = row_group_size
+        self.checkpoint = checkpoint
+        self.buffer = []
+        # Units whose rows are in the buffer
+        self.pending = []
+
+    def write(self, unit, rows: list):
+        self.buffer.extend(rows)
+        self.pending.append(unit)
+        if len(self.buffer) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        if self.buffer:
+            path = f"{self.stem}-{self.run_id}-{self.parts:05d}{self.ext}"
+            columns = columnar.to_columns(self.buffer, COLUMNS)
+            # Written under a temporary name so a half-written part is never picked up
+            self.pq.write_table(self.pa.table(columns, schema=self.schema), path + '.tmp')
+            os.replace(path + '.tmp', path)
+            self.parts += 1
+        for unit in self.pending:
+            self.checkpoint.mark(unit)
+        self.buffer = []
+        self.pending = []
+
+    def close(self):
+        self.flush()
+
+
+class Checkpoint:
+    def __init__(self, path: str, resume: bool):
+        self.done = set()
+        if resume and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.done = {tuple(line.rstrip('\n').split('\t', 1)) for line in f if '\t' in line}
+        self.file = open(path, 'a' if resume else 'w', encoding='utf-8')
+
+    def __contains__(self, unit):
+        return unit in self.done
+
+    def mark(self, unit):
+        self.file.write('\t'.join(unit) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def read_keywords(path: str):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            keyword = line.strip()
+            if keyword and not keyword.startswith('#'):
+                yield keyword
+
+
+async def run(args):
+    sources = args.sources.split(',') if args.sources else [name for _, name, _, _ in getData.ENABLED_STORES]
+    for source_name in sources:
+        if source_name not in getData.STORE_MODULES:
+            sys.exit(f"Unknown source {source_name}")
+        # Room for every in-flight crawl, so a busy store slows the batch down instead of
+        # rejecting (and checkpointing) crawls as empty
+        bulkhead.get(f"batch:{source_name}", queue=args.concurrency)
+
+    checkpoint = Checkpoint(args.checkpoint or args.output + '.checkpoint', args.resume)
+    if args.format == 'parquet':
+        writer = ParquetWriter(args.output, args.resume, args.row_group_size, checkpoint)
+    else:
+        writer = JsonlWriter(args.output, args.resume, checkpoint)
+
+    # Bounded queue: the keyword file is never read further ahead than the workers can take
+    queue = asyncio.Queue(maxsize=args.concurrency * 2)
+    stats = {'crawls': 0, 'skipped': 0, 'failed': 0, 'rows': 0}
+    started = time.monotonic()
+
+    async def worker():
+        while True:
+            unit = await queue.get()
+            if unit is None:
+                return
+            keyword, source_name = unit
+            try:
+                products = await getData.run_crawler(
+                    getData.STORE_MODULES[source_name], keyword, source_name, args.num_products,
+                    batch=True, proxy_images=False, as_rows=True, raise_errors=True,
+                )
+            except Exception:
+                stats['failed'] += 1
+                continue
+            crawled_at = time.time()
+            rows = [{**row, 'keyword': keyword, 'crawled_at': crawled_at} for row in products]
+            # The writer checkpoints the unit once its rows are on disk
+            writer.write(unit, rows)
+            stats['crawls'] += 1
+            stats['rows'] += len(rows)
+            if stats['crawls'] % 100 == 0:
+                print(f"{stats['crawls']} crawls, {stats['rows']} rows, {time.monotonic() - started:.0f}s")
+
+    workers = [asyncio.create_task(worker()) for _ in range(args.concurrency)]
+    try:
+        for keyword in read_keywords(args.keywords):
+            for source_name in sources:
+                unit = (keyword, source_name)
+                if unit in checkpoint:
+                    stats['skipped'] += 1
+                    continue
+                await queue.put(unit)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        writer.close()
+        checkpoint.close()
+
+    print(f"Done: {stats['crawls']} crawls ({stats['skipped']} already checkpointed, {stats['failed']} failed), "
+          f"{stats['rows']} rows in {time.monotonic() - started:.1f}s")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl many keywords across stores into JSONL or Parquet')
+    parser.add_argument('keywords', help='file with one keyword per line')
+    parser.add_argument('-o', '--output', required=True, help='output .jsonl file, or .parquet name the parts are written next to')
+    parser.add_argument('--format', choices=['jsonl', 'parquet'], help='defaults to the output file extension')
+    parser.add_argument('--sources', help='comma separated source names (default: enabled stores)')
+    parser.add_argument('--num-products', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=8, help='crawls in flight at once')
+    parser.add_argument('--row-group-size', type=int, default=5000, help='rows buffered per Parquet part')
+    parser.add_argument('--checkpoint', help='checkpoint file (default: <output>.checkpoint)')
+    parser.add_argument('--no-resume', dest='resume', action='store_false', help='start over instead of resuming')
+    args = parser.parse_args()
+    if args.format is None:
+        args.format = 'parquet' if args.output.endswith('.parquet') else 'jsonl'
+    # Non-zero exit tells a scheduler to re-run the command, which retries only the failures
+    if asyncio.run(run(args))['failed']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
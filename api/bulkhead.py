@@ -0,0 +1,95 @@
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Per-source thread pools so one hanging store cannot starve the others.
+# BULKHEAD_CONFIG='{"Lottemart": {"workers": 8, "queue": 32, "deadline": 10}}' overrides the defaults per source.
+BULKHEAD_WORKERS = int(os.environ.get('BULKHEAD_WORKERS', '4'))
+BULKHEAD_QUEUE = int(os.environ.get('BULKHEAD_QUEUE', '16'))
+# Seconds an interactive search waits for one source before answering without it
+BULKHEAD_DEADLINE = float(os.environ.get('BULKHEAD_DEADLINE', '20'))
+BULKHEAD_CONFIG = json.loads(os.environ.get('BULKHEAD_CONFIG', '{}'))
+
+
+class BulkheadFull(Exception):
+    pass
+
+
+class Bulkhead:
+    def __init__(self, name: str, workers: int, queue: int, deadline: float = BULKHEAD_DEADLINE):
+        self.name = name
+        self.workers = workers
+        self.queue = queue
+        self.deadline = deadline
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'bulkhead-{name}')
+        # One slot per running or waiting call; when none are left we reject immediately
+        self.slots = threading.BoundedSemaphore(workers + queue)
+        self.lock = threading.Lock()
+        self.stats = {'submitted': 0, 'rejected': 0, 'timed_out': 0, 'completed': 0, 'failed': 0, 'active': 0, 'in_flight': 0, 'peak_in_flight': 0}
+
+    def _count(self, key: str, delta: int = 1):
+        with self.lock:
+            self.stats[key] += delta
+            if key == 'in_flight':
+                self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self.stats['in_flight'])
+
+    def _call(self, fn, args):
+        self._count('active')
+        try:
+            return fn(*args)
+        finally:
+            self._count('active', -1)
+
+    def _release(self, future):
+        self.slots.release()
+        self._count('in_flight', -1)
+        self._count('failed' if future.cancelled() or future.exception() else 'completed')
+
+    async def run(self, fn, *args):
+        if not self.slots.acquire(blocking=False):
+            self._count('rejected')
+            raise BulkheadFull(f"{self.name} bulkhead is full ({self.workers} running, {self.queue} queued)")
+        self._count('submitted')
+        self._count('in_flight')
+        # The slot is released when the thread finishes, even if the awaiting request gave up
+        future = self.executor.submit(self._call, fn, args)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def count_timeout(self):
+        # The caller stopped waiting; the thread itself keeps its slot until it returns
+        self._count('timed_out')
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats['queued'] = max(0, stats['in_flight'] - stats['active'])
+        stats['workers'] = self.workers
+        stats['queue_capacity'] = self.queue
+        stats['deadline'] = self.deadline
+        stats['saturation'] = round(stats['in_flight'] / (self.workers + self.queue), 3)
+        return stats
+
+
+bulkheads = {}
+_lock = threading.Lock()
+
+
+def get(name: str, workers: int = None, queue: int = None) -> Bulkhead:
+    # `workers` / `queue` replace the defaults when the bulkhead is first created
+    with _lock:
+        if name not in bulkheads:
+            config = BULKHEAD_CONFIG.get(name, {})
+            bulkheads[name] = Bulkhead(
+                name,
+                workers=config.get('workers', BULKHEAD_WORKERS if workers is None else workers),
+                queue=config.get('queue', BULKHEAD_QUEUE if queue is None else queue),
+                deadline=config.get('deadline', BULKHEAD_DEADLINE),
+            )
+        return bulkheads[name]
+
+
+def get_stats():
+    return {name: bulkhead.snapshot() for name, bulkhead in list(bulkheads.items())}
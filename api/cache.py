@@ -0,0 +1,205 @@
+import json
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+# Crawl result cache shared by every uvicorn worker on a node.
+#   CACHE_URL=sqlite:///tmp/price-checker-cache.sqlite3   (default, cross-process via SQLite WAL)
+#   CACHE_URL=redis://127.0.0.1:6379/0                    (any Redis-protocol server)
+#   CACHE_URL=memory://                                   (per-process only)
+CACHE_URL = os.environ.get('CACHE_URL', 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'price-checker-cache.sqlite3'))
+CACHE_TTL = float(os.environ.get('CACHE_TTL', '300'))
+
+
+class CacheBackend(ABC):
+    def __init__(self):
+        self.stats_lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'sets': 0, 'errors': 0}
+
+    def _count(self, key: str):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    @abstractmethod
+    def get(self, key: str):
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: float):
+        pass
+
+    def get_json(self, key: str):
+        try:
+            value = self.get(key)
+        except Exception as e:
+            print(f"Error reading cache: {e}")
+            self._count('errors')
+            return None
+        self._count('misses' if value is None else 'hits')
+        return None if value is None else json.loads(value)
+
+    def set_json(self, key: str, value, ttl: float = CACHE_TTL):
+        # CACHE_TTL=0 turns result caching off
+        if ttl <= 0:
+            return
+        try:
+            self.set(key, json.dumps(value, ensure_ascii=False).encode(), ttl)
+            self._count('sets')
+        except Exception as e:
+            print(f"Error writing cache: {e}")
+            self._count('errors')
+
+    def snapshot(self):
+        with self.stats_lock:
+            return {'backend': type(self).__name__, **self.stats}
+
+
+class MemoryCache(CacheBackend):
+    def __init__(self, max_entries: int = 1024):
+        super().__init__()
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+
+    def get(self, key: str):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self.lock:
+            self.entries[key] = (value, time.time() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class SQLiteCache(CacheBackend):
+    # One connection per thread; WAL lets every worker process read while one writes
+    PURGE_EVERY = 500
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self.local = threading.local()
+        self.writes = 0
+        conn = self._conn()
+        conn.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL)')
+
+    def _conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        row = self._conn().execute(
+            'SELECT value FROM cache WHERE key = ? AND expires > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, ttl: float):
+        conn = self._conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)', (key, value, time.time() + ttl)
+        )
+        self.writes += 1
+        if self.writes % self.PURGE_EVERY == 0:
+            conn.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+
+
+class RedisCache(CacheBackend):
+    # Minimal RESP client (GET / SET PX), one connection per thread; no redis package needed
+    def __init__(self, host: str, port: int, db: int = 0, timeout: float = 2.0):
+        super().__init__()
+        self.address = (host, port)
+        self.db = db
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection(self.address, timeout=self.timeout)
+        self.local.sock = sock
+        self.local.reader = sock.makefile('rb')
+        if self.db:
+            self._send('SELECT', str(self.db))
+            self._read()
+
+    def _send(self, *args):
+        parts = [f'*{len(args)}\r\n'.encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        self.local.sock.sendall(b''.join(parts))
+
+    def _read(self):
+        line = self.local.reader.readline()
+        if not line:
+            raise ConnectionError('redis connection closed')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest
+        if kind == b'-':
+            raise RuntimeError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length == -1:
+                return None
+            data = self.local.reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            count = int(rest)
+            return None if count == -1 else [self._read() for _ in range(count)]
+        raise RuntimeError(f'unexpected redis reply {line!r}')
+
+    def _command(self, *args):
+        for attempt in range(2):
+            if getattr(self.local, 'sock', None) is None:
+                self._connect()
+            try:
+                self._send(*args)
+                return self._read()
+            except (OSError, ConnectionError):
+                self.local.sock.close()
+                self.local.sock = None
+                if attempt:
+                    raise
+
+    def get(self, key: str):
+        return self._command('GET', key)
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self._command('SET', key, value, 'PX', int(ttl * 1000))
+
+
+def from_url(url: str) -> CacheBackend:
+    parts = urlsplit(url)
+    if parts.scheme == 'memory':
+        return MemoryCache()
+    if parts.scheme == 'sqlite':
+        return SQLiteCache(parts.path)
+    if parts.scheme == 'redis':
+        db = int(parts.path.lstrip('/') or 0)
+        return RedisCache(parts.hostname or '127.0.0.1', parts.port or 6379, db)
+    raise ValueError(f"Unsupported CACHE_URL scheme: {parts.scheme}")
+
+
+backend = from_url(CACHE_URL)
@@ -0,0 +1,125 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+# Per-product change detection. Every freshly crawled row is compared with the last-seen
+# price/discount/stock of the same (source, url, location); only differences are stored in
+# the `changes` log, which /api/changes serves as a compact delta feed.
+CHANGES_DB = os.environ.get('CHANGES_DB', os.path.join(tempfile.gettempdir(), 'price-checker-changes.sqlite3'))
+
+# Column order of one delta row in the feed and in storage
+FIELDS = ['seq', 'ts', 'source', 'url', 'location', 'originalPrice', 'discountPrice', 'quantity']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS last_seen (
+    source TEXT NOT NULL,
+    url TEXT NOT NULL,
+    location TEXT NOT NULL,
+    original_price INTEGER,
+    discount_price INTEGER,
+    quantity REAL,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (source, url, location)
+);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    source TEXT NOT NULL,
+    url TEXT NOT NULL,
+    location TEXT NOT NULL,
+    original_price INTEGER,
+    discount_price INTEGER,
+    quantity REAL
+);
+CREATE INDEX IF NOT EXISTS changes_source ON changes (source, seq);
+"""
+
+
+def _number(value):
+    # Stores report stock as numbers, numeric strings or status words; keep only numbers
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ChangeTracker:
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA busy_timeout=5000')
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.stats = {'seen': 0, 'changed': 0}
+
+    def record(self, source: str, items: list) -> int:
+        # Returns how many rows changed (new products count as changes)
+        now = time.time()
+        rows = {}
+        for item in items:
+            if not item.get('url'):
+                continue
+            key = (source, item['url'], item.get('location') or '')
+            rows[key] = (item.get('originalPrice'), item.get('discountPrice'), _number(item.get('quantity')))
+        if not rows:
+            return 0
+
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                changed = []
+                for key, fingerprint in rows.items():
+                    previous = self.conn.execute(
+                        'SELECT original_price, discount_price, quantity FROM last_seen '
+                        'WHERE source = ? AND url = ? AND location = ?', key
+                    ).fetchone()
+                    if previous != fingerprint:
+                        changed.append((now, *key, *fingerprint))
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO last_seen (source, url, location, original_price, discount_price, quantity, seen_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    [(*key, *fingerprint, now) for key, fingerprint in rows.items()],
+                )
+                self.conn.executemany(
+                    'INSERT INTO changes (ts, source, url, location, original_price, discount_price, quantity) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    changed,
+                )
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+            self.stats['seen'] += len(rows)
+            self.stats['changed'] += len(changed)
+        return len(changed)
+
+    def since(self, seq: int = 0, limit: int = 1000, source: str = None):
+        sql = ('SELECT seq, ts, source, url, location, original_price, discount_price, quantity '
+               'FROM changes WHERE seq > ?')
+        params = [seq]
+        if source:
+            sql += ' AND source = ?'
+            params.append(source)
+        sql += ' ORDER BY seq LIMIT ?'
+        params.append(limit)
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        # Compact delta format: field names once, then one positional array per change
+        return {
+            'fields': FIELDS,
+            'changes': [list(row) for row in rows],
+            'next': rows[-1][0] if rows else seq,
+        }
+
+    def snapshot(self):
+        with self.lock:
+            tracked = self.conn.execute('SELECT COUNT(*) FROM last_seen').fetchone()[0]
+            stored = self.conn.execute('SELECT COUNT(*) FROM changes').fetchone()[0]
+            return {**self.stats, 'tracked_products': tracked, 'stored_changes': stored}
+
+
+tracker = ChangeTracker(CHANGES_DB)
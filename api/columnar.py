@@ -0,0 +1,61 @@
+import io
+import json
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    USE_ARROW = True
+except ImportError:
+    USE_ARROW = False
+
+# Column-oriented search responses built straight from the crawler rows, without a Product
+# model per item: field names are sent once and every field becomes one array.
+#   format="columnar" -> {"keyword": ..., "count": n, "columns": {"name": [...], ...}}
+#   format="arrow"    -> Arrow IPC stream, one record batch (needs pyarrow)
+COLUMNS = [
+    ('name', 'string'),
+    ('url', 'string'),
+    ('image_url', 'string'),
+    ('discountPrice', 'int64'),
+    ('originalPrice', 'int64'),
+    ('unit', 'string'),
+    ('quantity', 'float64'),
+    ('source', 'string'),
+    ('location', 'string'),
+    ('unitPrice', 'float64'),
+    ('canonicalUnit', 'string'),
+]
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+
+CASTS = {'string': str, 'int64': int, 'float64': float}
+
+
+def _coerce(value, kind):
+    # Crawlers report numbers as int, float or text; a column needs exactly one type
+    try:
+        return None if value is None else CASTS[kind](value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_columns(rows: list, columns: list = COLUMNS) -> dict:
+    # One typed list per (name, kind) column, the same types Product would validate to
+    return {name: [_coerce(row.get(name), kind) for row in rows] for name, kind in columns}
+
+
+def encode_json(keyword: str, rows: list) -> bytes:
+    body = {'keyword': keyword, 'count': len(rows), 'columns': to_columns(rows)}
+    return json.dumps(body, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def encode_arrow(keyword: str, rows: list) -> bytes:
+    columns = to_columns(rows)
+    schema = pa.schema([(name, getattr(pa, kind)()) for name, kind in COLUMNS],
+                       metadata={'keyword': keyword})
+    batch = pa.record_batch([pa.array(columns[name], type=schema.field(name).type) for name, _ in COLUMNS],
+                            schema=schema)
+    sink = io.BytesIO()
+    with ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue()
@@ -1,12 +1,15 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, RedirectResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
+from contextlib import asynccontextmanager
 import asyncio
 import sys
 import os
 
-# Add the Crawler directory to the python path
+# Add the api and Crawler directories to the python path
+sys.path.append(os.path.dirname(__file__))
 sys.path.append(os.path.join(os.path.dirname(__file__), 'Crawler'))
 
 import coop
@@ -20,7 +23,56 @@ import bachHoaXanh
 import kamereo
 import winMart
 
-app = FastAPI()
+from hedging import hedged_call, get_stats as get_hedging_stats
+from transport import get_cache_stats as get_http_cache_stats
+import warmup
+import bulkhead
+import image_proxy
+from locations import fetch_locations, limit_per_location
+import jobs
+import cache
+import changes
+import relevance
+import units
+import columnar
+
+# (crawler module, source name, upstream host, enabled)
+STORES = [
+    (coop, "Coopmart", "discovery.tekoapis.com", False),
+    (emart, "Emart", "emartmall.com.vn", True),
+    (farmer, "Farmers Market", "farmersmarket.vn", True),
+    (kingfood, "KingFoodmart", "onelife-api.kingfoodmart.com", True),
+    (lotte, "Lottemart", "www.lottemart.vn", True),
+    (megaMarket, "MegaMarket", "online.mmvietnam.com", False),
+    (three_sach, "3Sach", "3sach.vn", False),
+    (bachHoaXanh, "BachHoaXanh", "api.bachhoaxanh.com", False),
+    (kamereo, "Kamereo", "buyer-graphql.prod.kamereo.vn", False),
+    (winMart, "WinMart", "api-crownx.winmart.vn", False),
+]
+ENABLED_STORES = [store for store in STORES if store[3]]
+STORE_MODULES = {source_name: module for module, source_name, _, _ in STORES}
+
+job_store = None
+job_queue = None
+# Background change-tracking writes; referenced until done so they are not garbage collected
+pending_changes = set()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm DNS, TLS connections and (optionally) a canary search in the background;
+    # /api/ready reports 503 until it finishes.
+    hosts = [host for _, _, host, _ in ENABLED_STORES]
+    task = asyncio.create_task(warmup.warm_up(hosts, canary=canary_search))
+
+    global job_store, job_queue
+    job_store = jobs.JobStore(jobs.JOBS_DB)
+    job_queue = jobs.JobQueue(job_store, run_job_crawl)
+    job_queue.start()
+    yield
+    task.cancel()
+    await job_queue.stop()
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -40,77 +92,175 @@ class Product(BaseModel):
     unit: Optional[str] = None
     quantity: Optional[float] = None
     source: str
+    location: Optional[str] = None
+    # Price per kg, litre or item parsed from the pack size, see units.py
+    unitPrice: Optional[float] = None
+    canonicalUnit: Optional[str] = None
 
 class SearchRequest(BaseModel):
     keyword: str
     num_products: Optional[int] = 10
+    # Source name -> store-specific location ids, e.g. {"Lottemart": ["vi_nsg", "vi_nhn"]}
+    locations: Optional[Dict[str, List[str]]] = None
+    # "unit_price" returns the `limit` cheapest products per unit instead of every result,
+    # ranking `canonical_unit` ("kg", "l" or "item"; default the most common) first
+    sort: Optional[str] = None
+    canonical_unit: Optional[str] = None
+    limit: Optional[int] = None
+    # "columnar" (struct-of-arrays JSON) or "arrow" (Arrow IPC stream); default is SearchResponse
+    format: Optional[str] = None
 
 class SearchResponse(BaseModel):
     keyword: str
     results: List[Product]
 
-async def run_crawler(crawler_module, keyword: str, source_name: str, num_products) -> List[Product]:
+class CrawlSpec(BaseModel):
+    keyword: str
+    num_products: int = 10
+    # Defaults to the enabled stores; any store in STORES may be named
+    sources: Optional[List[str]] = None
+    locations: Optional[Dict[str, List[str]]] = None
+
+class JobRequest(BaseModel):
+    crawls: List[CrawlSpec]
+    # Lower runs first
+    priority: int = 5
+
+class CrawlError(Exception):
+    pass
+
+async def record_changes(source_name: str, data: list):
+    # Only freshly crawled rows are compared; cache hits cannot carry new prices
     try:
-        data = []
-        if source_name == 'Coopmart':
-            data = await asyncio.to_thread(crawler_module.fetch_data, keyword, num_products)
-        elif source_name == 'Emart':
-            data = await asyncio.to_thread(crawler_module.crawl, keyword, num_products)
-        elif source_name == 'Farmers Market':
-            data = await asyncio.to_thread(crawler_module.crawl, keyword, num_products)
-        elif source_name == 'KingFoodmart':
-            data = await asyncio.to_thread(crawler_module.fetch_data, keyword, num_products)
-        elif source_name == 'Lottemart':
-            data = await asyncio.to_thread(crawler_module.fetch_data, keyword, num_products)
-        elif source_name == 'MegaMarket':
-            data = await asyncio.to_thread(crawler_module.fetch_data, keyword, num_products)
-        elif source_name == '3Sach':
-            data = await asyncio.to_thread(crawler_module.crawl, keyword, num_products)
-        elif source_name == 'BachHoaXanh':
-            data = await asyncio.to_thread(crawler_module.fetch_data, keyword, num_products)
-        elif source_name == 'Kamereo':
-            data = await asyncio.to_thread(crawler_module.fetch_data, keyword, num_products)
-        elif source_name == 'WinMart':
-            data = await asyncio.to_thread(crawler_module.fetch_data, keyword, num_products)
+        await asyncio.to_thread(changes.tracker.record, source_name, data)
+    except Exception as e:
+        print(f"Error recording changes for {source_name}: {e}")
+
+async def run_crawler(crawler_module, keyword: str, source_name: str, num_products, locations: Optional[List[str]] = None, batch: bool = False, proxy_images: bool = True, adaptive: bool = False, as_rows: bool = False, raise_errors: bool = False) -> List[Product]:
+    try:
+        # `num_products` is the number of relevant products wanted; adaptive crawls ask the
+        # store for more when it usually returns loosely matched items, then drop those
+        target = num_products
+        words = relevance.query_words(keyword)
+        if adaptive:
+            num_products = relevance.tracker.fetch_size(source_name, keyword, target)
+
+        if source_name in ('Emart', 'Farmers Market', '3Sach'):
+            fetch = crawler_module.crawl
+        else:
+            fetch = crawler_module.fetch_data
+
+        if batch:
+            # Batch work gets its own bulkheads so it never takes interactive threads, and is
+            # not latency-sensitive enough to be hedged
+            submit = bulkhead.get(f"batch:{source_name}").run
+            call = submit
+        elif adaptive and relevance.tracker.is_low_priority(source_name, keyword):
+            # Stores that rarely return relevant products do not spend the hedge budget
+            submit = bulkhead.get(source_name).run
+            call = submit
+        else:
+            submit = bulkhead.get(source_name).run
+            call = lambda run, *args: hedged_call(source_name, run, *args, submit=submit)
+        deadline = None if batch else bulkhead.get(source_name).deadline
+
+        # Raw crawler rows are shared across worker processes; batch crawls always refresh them.
+        # Keyed on the requested count, not the adapted fetch size, which drifts with every crawl
+        cache_key = f"crawl:{source_name}:{target}:{','.join(locations or [])}:{keyword.strip()}"
+        data = None if batch else await asyncio.to_thread(cache.backend.get_json, cache_key)
+        if data is None:
+            # A store that misses its deadline is answered without, so it only degrades its
+            # own results; batch crawls are bounded by the transport timeouts instead
+            if locations and hasattr(crawler_module, 'DEFAULT_LOCATION'):
+                crawl = fetch_locations(crawler_module, keyword, num_products, locations, call, submit)
+            else:
+                crawl = call(fetch, keyword, num_products)
+            data = await asyncio.wait_for(crawl, deadline)
+            # API crawlers return None when the store request failed
+            if data is None and raise_errors:
+                raise CrawlError(f"{source_name} returned no data")
+            if data:
+                await asyncio.to_thread(cache.backend.set_json, cache_key, data)
+                # Change tracking writes to SQLite; keep it off the response path
+                task = asyncio.create_task(record_changes(source_name, data))
+                pending_changes.add(task)
+                task.add_done_callback(pending_changes.discard)
+                relevant = sum(1 for item in data if relevance.is_relevant(item.get('name'), words))
+                relevance.tracker.record(source_name, keyword, len(data), relevant)
+        if adaptive and data:
+            data = [item for item in data if relevance.is_relevant(item.get('name'), words)]
+        if data:
+            # Cached rows may come from a larger adaptive fetch
+            data = limit_per_location(data, target)
         
         if not data:
             return []
 
-        # Standardize results to Product model
-        products = []
+        units.normalize(data)
+
+        # Standardize results to the Product fields; `as_rows` skips building a model per
+        # item for callers that serialize the plain dicts themselves
+        rows = []
         for item in data:
-            products.append(Product(
+            rows.append(dict(
                 name=item.get('name', '') or '',
                 url=item.get('url', '') or '',
-                image_url=item.get('image_url'),
+                image_url=image_proxy.proxied_url(item.get('image_url')) if proxy_images else item.get('image_url'),
                 discountPrice=item.get('discountPrice'),
                 originalPrice=item.get('originalPrice'),
                 unit=item.get('unit'),
                 quantity=item.get('quantity'),
-                source=source_name
+                source=source_name,
+                location=item.get('location'),
+                unitPrice=item.get('unitPrice'),
+                canonicalUnit=item.get('canonicalUnit')
             ))
-        return products
+        if as_rows:
+            return rows
+        return [Product(**row) for row in rows]
 
+    except bulkhead.BulkheadFull as e:
+        print(f"Rejected crawler {source_name}: {e}")
+        if raise_errors:
+            raise
+        return []
+    except asyncio.TimeoutError:
+        bulkhead.get(source_name).count_timeout()
+        print(f"Timed out crawler {source_name} after {bulkhead.get(source_name).deadline}s")
+        if raise_errors:
+            raise
+        return []
     except Exception as e:
         print(f"Error running crawler {source_name}: {e}")
+        # Jobs and batch runs need to tell a failed crawl from one that found nothing
+        if raise_errors:
+            raise
         return []
 
 @app.post("/api/search", response_model=SearchResponse)
 async def search(request: SearchRequest):
+    if request.sort not in (None, 'unit_price'):
+        raise HTTPException(status_code=400, detail=f"Unknown sort {request.sort}")
+    if request.canonical_unit not in (None, *units.CANONICAL_UNITS):
+        raise HTTPException(status_code=400, detail=f"Unknown canonical_unit {request.canonical_unit}")
+    if request.limit is not None and request.limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+    if request.format not in (None, 'json', 'columnar', 'arrow'):
+        raise HTTPException(status_code=400, detail=f"Unknown format {request.format}")
+    if request.format == 'arrow' and not columnar.USE_ARROW:
+        raise HTTPException(status_code=400, detail="Arrow format needs pyarrow on the server")
+    as_rows = request.format in ('columnar', 'arrow')
     keyword = request.keyword
     num_products = request.num_products
     
+    locations = request.locations or {}
+    
+    # Stores expected to contribute the most relevant products are submitted first
+    ranked = relevance.tracker.rank([source_name for _, source_name, _, _ in ENABLED_STORES], keyword)
     tasks = [
-        # run_crawler(coop, keyword, "Coopmart", num_products),
-        run_crawler(emart, keyword, "Emart", num_products),
-        run_crawler(farmer, keyword, "Farmers Market", num_products),
-        run_crawler(kingfood, keyword, "KingFoodmart", num_products),
-        run_crawler(lotte, keyword, "Lottemart", num_products),
-        # run_crawler(megaMarket, keyword, "MegaMarket", num_products),
-        # run_crawler(three_sach, keyword, "3Sach", num_products),
-        # run_crawler(bachHoaXanh, keyword, "BachHoaXanh", num_products),
-        # run_crawler(kamereo, keyword, "Kamereo", num_products),
-        # run_crawler(winMart, keyword, "WinMart", num_products),
+        run_crawler(STORE_MODULES[source_name], keyword, source_name, num_products, locations.get(source_name),
+                    adaptive=relevance.ADAPTIVE_FETCH, as_rows=as_rows)
+        for source_name in ranked
     ]
     
     results_list = await asyncio.gather(*tasks)
@@ -119,9 +269,126 @@ async def search(request: SearchRequest):
     all_products = []
     for results in results_list:
         all_products.extend(results)
+
+    if request.sort == 'unit_price':
+        all_products = units.top_k(all_products, request.limit or len(all_products), request.canonical_unit,
+                                   field=dict.get if as_rows else getattr)
+    elif request.limit:
+        all_products = all_products[:request.limit]
+
+    if request.format == 'columnar':
+        return Response(content=columnar.encode_json(keyword, all_products), media_type='application/json')
+    if request.format == 'arrow':
+        return Response(content=columnar.encode_arrow(keyword, all_products), media_type=columnar.ARROW_MEDIA_TYPE)
     
     return SearchResponse(keyword=keyword, results=all_products)
 
+async def canary_search(keyword: str) -> int:
+    results_list = await asyncio.gather(*[
+        run_crawler(module, keyword, source_name, 1)
+        for module, source_name, _, _ in ENABLED_STORES
+    ])
+    return sum(len(results) for results in results_list)
+
+async def run_job_crawl(keyword: str, source_name: str, num_products: int, locations: Optional[List[str]]):
+    return await run_crawler(STORE_MODULES[source_name], keyword, source_name, num_products, locations, batch=True, as_rows=True, raise_errors=True)
+
+@app.post("/api/jobs")
+async def submit_job(request: JobRequest):
+    default_sources = [source_name for _, source_name, _, _ in ENABLED_STORES]
+    crawl_units = []
+    for crawl in request.crawls:
+        if crawl.num_products < 1:
+            raise HTTPException(status_code=400, detail="num_products must be at least 1")
+        for source_name in crawl.sources or default_sources:
+            if source_name not in STORE_MODULES:
+                raise HTTPException(status_code=400, detail=f"Unknown source {source_name}")
+            crawl_units.append({
+                'keyword': crawl.keyword,
+                'source': source_name,
+                'num_products': crawl.num_products,
+                'locations': (crawl.locations or {}).get(source_name),
+            })
+    if not crawl_units:
+        raise HTTPException(status_code=400, detail="No crawls to run")
+    job_id = await job_queue.submit(crawl_units, request.priority)
+    return await asyncio.to_thread(job_store.get_job, job_id)
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, after: int = 0):
+    # Poll with the last `seq` seen as `after` to receive only newly finished crawls
+    job = await asyncio.to_thread(job_store.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {**job, 'results': await asyncio.to_thread(job_store.get_results, job_id, after)}
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    if await asyncio.to_thread(job_store.get_job, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(jobs.stream_events(job_store, job_id), media_type="text/event-stream")
+
+@app.get("/api/image")
+async def image(u: str, s: str, request: Request, w: int = image_proxy.DEFAULT_WIDTH):
+    if not image_proxy.verify(u, s):
+        raise HTTPException(status_code=403, detail="Invalid image signature")
+    accept = request.headers.get('accept', '')
+    try:
+        hit = await asyncio.to_thread(image_proxy.cached, u, w, accept)
+        if hit is None:
+            hit = await bulkhead.get(
+                'ImageProxy', workers=image_proxy.IMAGE_PROXY_WORKERS, queue=image_proxy.IMAGE_PROXY_QUEUE
+            ).run(image_proxy.load, u, w, accept)
+        data, media_type = hit
+    except bulkhead.BulkheadFull:
+        # Let the browser load the original image rather than show a broken one
+        return RedirectResponse(u, status_code=302)
+    except Exception as e:
+        print(f"Error proxying image {u}: {e}")
+        raise HTTPException(status_code=502, detail="Failed to fetch image")
+    return Response(content=data, media_type=media_type, headers={
+        'Cache-Control': 'public, max-age=31536000, immutable',
+        'Vary': 'Accept',
+    })
+
+@app.get("/api/changes")
+async def price_changes(since: int = 0, limit: int = 1000, source: Optional[str] = None):
+    # Poll with ?since=<next from the previous response> to receive only newer changes
+    return await asyncio.to_thread(changes.tracker.since, since, min(max(limit, 1), 10000), source)
+
+@app.get("/api/changes/stats")
+async def change_stats():
+    return await asyncio.to_thread(changes.tracker.snapshot)
+
+@app.get("/api/relevance")
+async def relevance_stats():
+    return relevance.tracker.snapshot()
+
+@app.get("/api/ready")
+async def ready():
+    status_code = 200 if warmup.state['ready'] else 503
+    return JSONResponse(status_code=status_code, content=warmup.state)
+
+@app.get("/api/hedging")
+async def hedging_stats():
+    return get_hedging_stats()
+
+@app.get("/api/bulkheads")
+async def bulkhead_stats():
+    return bulkhead.get_stats()
+
+@app.get("/api/image-cache")
+async def image_cache_stats():
+    return image_proxy.get_stats()
+
+@app.get("/api/cache")
+async def result_cache_stats():
+    return cache.backend.snapshot()
+
+@app.get("/api/http-cache")
+async def http_cache_stats():
+    return get_http_cache_stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+
+# Stores to hedge: comma separated source names, or "all". Empty disables hedging.
+HEDGE_STORES = {s.strip() for s in os.environ.get('HEDGE_STORES', '').split(',') if s.strip()}
+HEDGE_PERCENTILE = float(os.environ.get('HEDGE_PERCENTILE', '0.95'))
+# Fraction of primary requests that may be hedged, e.g. 0.05 => at most ~5% extra upstream load
+HEDGE_BUDGET = float(os.environ.get('HEDGE_BUDGET', '0.05'))
+HEDGE_MIN_SAMPLES = int(os.environ.get('HEDGE_MIN_SAMPLES', '20'))
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def percentile(self, p: float):
+        with self.lock:
+            if len(self.samples) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(p * len(ordered)))
+        return ordered[index]
+
+
+class HedgeBudget:
+    # Token bucket: every primary request earns `ratio` tokens, every hedge spends one.
+    def __init__(self, ratio: float, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = 0.0
+        self.lock = threading.Lock()
+
+    def earn(self):
+        with self.lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self.lock:
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            return False
+
+
+trackers = {}
+budgets = {}
+stats = {}
+
+
+def is_enabled(source_name: str) -> bool:
+    return 'all' in HEDGE_STORES or source_name in HEDGE_STORES
+
+
+def _state(source_name: str):
+    if source_name not in trackers:
+        trackers[source_name] = LatencyTracker()
+        budgets[source_name] = HedgeBudget(HEDGE_BUDGET)
+        stats[source_name] = {'requests': 0, 'hedged': 0, 'hedge_wins': 0}
+    return trackers[source_name], budgets[source_name], stats[source_name]
+
+
+async def _first_success(tasks):
+    # Return the first result that did not raise; re-raise only if every attempt failed.
+    pending = set(tasks)
+    error = None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None:
+                return task
+            error = task.exception()
+    raise error
+
+
+async def hedged_call(source_name: str, run, *args, submit=asyncio.to_thread):
+    # Run `submit(run, *args)`; if it is slower than the store's observed p95 latency,
+    # fire a second identical call and keep whichever finishes first.
+    tracker, budget, counters = _state(source_name)
+    counters['requests'] += 1
+    budget.earn()
+
+    start = time.monotonic()
+
+    def timed_run(*args):
+        # Recorded in the worker thread when the call returns, so a primary that lost to its
+        # hedge (and whose awaiting task was cancelled) still contributes its slow sample.
+        # Only successful primary calls are recorded; rejections never get here.
+        result = run(*args)
+        tracker.record(time.monotonic() - start)
+        return result
+
+    primary = asyncio.ensure_future(submit(timed_run, *args))
+    attempts = [primary]
+
+    try:
+        delay = tracker.percentile(HEDGE_PERCENTILE) if is_enabled(source_name) else None
+        if delay is None:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not budget.try_spend():
+            return await primary
+
+        counters['hedged'] += 1
+        hedge = asyncio.ensure_future(submit(run, *args))
+        attempts.append(hedge)
+        winner = await _first_success(attempts)
+        if winner is hedge:
+            counters['hedge_wins'] += 1
+        return winner.result()
+    finally:
+        # Cancel the loser (or both attempts if our caller gave up). A thread that already
+        # started cannot be interrupted; it finishes in the background and its outcome,
+        # including any exception, is discarded.
+        for task in attempts:
+            if not task.done():
+                task.cancel()
+            task.add_done_callback(_discard)
+
+
+def _discard(task):
+    if not task.cancelled():
+        task.exception()
+
+
+def get_stats():
+    return {
+        source: {
+            **counters,
+            'p95': trackers[source].percentile(HEDGE_PERCENTILE),
+            'enabled': is_enabled(source),
+        }
+        for source, counters in stats.items()
+    }
@@ -0,0 +1,221 @@
+import hashlib
+import hmac
+import io
+import os
+import tempfile
+import threading
+from urllib.parse import quote, urlsplit
+
+import transport
+
+# Pillow is optional: without it the proxy still caches and serves the original image bytes
+try:
+    from PIL import Image
+    USE_PIL = True
+except ImportError:
+    USE_PIL = False
+
+IMAGE_CACHE_DIR = os.environ.get('IMAGE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'price-checker-images'))
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_BYTES', str(200 * 2 ** 20)))
+# Signing keeps the proxy from fetching arbitrary URLs. The key must be the same for every
+# worker and instance and survive restarts (URLs are served as immutable), so without
+# IMAGE_PROXY_SECRET image URLs are left pointing at the stores.
+IMAGE_PROXY_SECRET = os.environ.get('IMAGE_PROXY_SECRET', '')
+IMAGE_PROXY = os.environ.get('IMAGE_PROXY', '1') == '1' and bool(IMAGE_PROXY_SECRET)
+# Sized for a page of product cards loading at once; cache hits do not take a slot
+IMAGE_PROXY_WORKERS = int(os.environ.get('IMAGE_PROXY_WORKERS', '8'))
+IMAGE_PROXY_QUEUE = int(os.environ.get('IMAGE_PROXY_QUEUE', '128'))
+THUMBNAIL_WIDTHS = (64, 128, 256, 512)
+DEFAULT_WIDTH = 128
+MAX_SOURCE_BYTES = 10 * 2 ** 20
+
+FORMATS = {
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+}
+
+
+class ImageProxyError(Exception):
+    pass
+
+
+def sign(url: str) -> str:
+    return hmac.new(IMAGE_PROXY_SECRET.encode(), url.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def proxied_url(image_url, width: int = DEFAULT_WIDTH):
+    if not IMAGE_PROXY or not image_url or urlsplit(image_url).scheme not in ('http', 'https'):
+        return image_url
+    return f"/api/image?u={quote(image_url, safe='')}&w={width}&s={sign(image_url)}"
+
+
+def verify(url: str, signature: str) -> bool:
+    return IMAGE_PROXY and hmac.compare_digest(sign(url), signature or '')
+
+
+class DiskCache:
+    # Size-bounded directory of cached files, evicting least recently used by mtime
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.total = None
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _scan(self):
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+        return files
+
+    def read(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            with self.lock:
+                self.stats['misses'] += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            # Evicted by another worker after we read it; the bytes we have are still good
+            pass
+        with self.lock:
+            self.stats['hits'] += 1
+        return data
+
+    def write(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self.lock:
+            if self.total is None:
+                self.total = sum(size for _, size, _ in self._scan())
+            else:
+                self.total += len(data)
+            if self.total > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Trim to 90% of the budget so we are not evicting on every write
+        files = sorted(self._scan())
+        self.total = sum(size for _, size, _ in files)
+        target = self.max_bytes * 0.9
+        for _, size, path in files:
+            if self.total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.total -= size
+            self.stats['evictions'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {**self.stats, 'bytes': self.total, 'max_bytes': self.max_bytes}
+
+
+cache = DiskCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES)
+
+
+def _key(*parts) -> str:
+    return hashlib.sha256('|'.join(str(p) for p in parts).encode()).hexdigest()
+
+
+def _fetch_original(url: str) -> bytes:
+    key = _key('original', url)
+    data = cache.read(key)
+    if data is not None:
+        return data
+    response = transport.get(url, timeout=10, stream=True)
+    if response.status_code != 200:
+        response.close()
+        raise ImageProxyError(f"upstream returned {response.status_code}")
+    if not response.headers.get('Content-Type', 'image/').startswith('image/'):
+        response.close()
+        raise ImageProxyError("upstream did not return an image")
+    data = response.raw.read(MAX_SOURCE_BYTES + 1, decode_content=True)
+    response.close()
+    if len(data) > MAX_SOURCE_BYTES:
+        raise ImageProxyError("image too large")
+    cache.write(key, data)
+    return data
+
+
+def _sniff(data: bytes) -> str:
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'image/png'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    if data[:3] == b'GIF':
+        return 'image/gif'
+    return 'image/jpeg'
+
+
+def _resize(data: bytes, width: int, fmt: str) -> bytes:
+    with Image.open(io.BytesIO(data)) as image:
+        image.thumbnail((width, width * 4))
+        if fmt == 'jpeg' and image.mode != 'RGB':
+            # Product cards render on white, so flatten any transparency onto white
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel('A'))
+        out = io.BytesIO()
+        image.save(out, format=fmt.upper(), quality=80, optimize=True)
+        return out.getvalue()
+
+
+def _variant(width: int, accept: str):
+    width = min(THUMBNAIL_WIDTHS, key=lambda w: abs(w - width))
+    return width, 'webp' if 'image/webp' in (accept or '') else 'jpeg'
+
+
+def cached(url: str, width: int, accept: str = ''):
+    # (bytes, content type) if the variant `load` would return is already on disk, else None
+    if not USE_PIL:
+        data = cache.read(_key('original', url))
+        return None if data is None else (data, _sniff(data))
+    width, fmt = _variant(width, accept)
+    data = cache.read(_key('thumb', url, width, fmt))
+    return None if data is None else (data, FORMATS[fmt])
+
+
+def load(url: str, width: int, accept: str = ''):
+    # Returns (bytes, content type) for the thumbnail of `url`, caching every variant on disk
+    if not USE_PIL:
+        original = _fetch_original(url)
+        return original, _sniff(original)
+
+    width, fmt = _variant(width, accept)
+    key = _key('thumb', url, width, fmt)
+    data = cache.read(key)
+    if data is not None:
+        return data, FORMATS[fmt]
+
+    original = _fetch_original(url)
+    try:
+        data = _resize(original, width, fmt)
+    except Exception as e:
+        print(f"Error resizing image {url}: {e}")
+        return original, _sniff(original)
+    cache.write(key, data)
+    return data, FORMATS[fmt]
+
+
+def get_stats():
+    return {**cache.snapshot(), 'enabled': IMAGE_PROXY, 'resize': USE_PIL}
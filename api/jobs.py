@@ -0,0 +1,243 @@
+import asyncio
+import itertools
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+# Background crawl jobs: a batch of crawls is submitted once, split into one unit per
+# (keyword, source), run by a small worker pool in priority order and persisted in SQLite
+# so progress survives restarts and can be polled from any request.
+JOBS_DB = os.environ.get('JOBS_DB', os.path.join(tempfile.gettempdir(), 'price-checker-jobs.sqlite3'))
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+# Units left "running" for longer than this (e.g. by a crashed process) are picked up again
+# by the next rescan, which every process runs every JOB_RESCAN_SECONDS
+JOB_STALE_SECONDS = float(os.environ.get('JOB_STALE_SECONDS', '600'))
+JOB_RESCAN_SECONDS = float(os.environ.get('JOB_RESCAN_SECONDS', '60'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    priority INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    total INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_units (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    keyword TEXT NOT NULL,
+    source TEXT NOT NULL,
+    num_products INTEGER NOT NULL,
+    locations TEXT,
+    status TEXT NOT NULL,
+    claimed_at REAL,
+    finished_at REAL,
+    seq INTEGER,
+    results TEXT,
+    error TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS job_units_status ON job_units (status);
+"""
+
+
+class JobStore:
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA busy_timeout=5000')
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    # The connection is shared by threads, so every statement and its fetch run under the lock
+    def _execute(self, sql: str, params=()) -> int:
+        with self.lock:
+            return self.conn.execute(sql, params).rowcount
+
+    def _query(self, sql: str, params=()) -> list:
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def create_job(self, job_id: str, priority: int, units: list):
+        with self.lock:
+            self.conn.execute('BEGIN')
+            self.conn.execute(
+                'INSERT INTO jobs (id, priority, created_at, total) VALUES (?, ?, ?, ?)',
+                (job_id, priority, time.time(), len(units)),
+            )
+            self.conn.executemany(
+                'INSERT INTO job_units (job_id, idx, keyword, source, num_products, locations, status) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(job_id, idx, u['keyword'], u['source'], u['num_products'], json.dumps(u.get('locations')), 'queued')
+                 for idx, u in enumerate(units)],
+            )
+            self.conn.execute('COMMIT')
+
+    def claim(self, job_id: str, idx: int) -> bool:
+        # Atomic so that only one worker (in any process) runs a unit
+        updated = self._execute(
+            "UPDATE job_units SET status = 'running', claimed_at = ? "
+            "WHERE job_id = ? AND idx = ? AND (status = 'queued' OR (status = 'running' AND claimed_at < ?))",
+            (time.time(), job_id, idx, time.time() - JOB_STALE_SECONDS),
+        )
+        return updated == 1
+
+    def finish(self, job_id: str, idx: int, results: list = None, error: str = None):
+        now = time.time()
+        # `seq` increases in commit order, so pollers never miss a unit that finished concurrently
+        self._execute(
+            'UPDATE job_units SET status = ?, finished_at = ?, results = ?, error = ?, '
+            'seq = (SELECT COALESCE(MAX(seq), 0) + 1 FROM job_units) WHERE job_id = ? AND idx = ?',
+            ('failed' if error else 'done', now, json.dumps(results, ensure_ascii=False), error, job_id, idx),
+        )
+        self._execute(
+            "UPDATE jobs SET finished_at = ? WHERE id = ? AND finished_at IS NULL AND NOT EXISTS "
+            "(SELECT 1 FROM job_units WHERE job_id = ? AND status IN ('queued', 'running'))",
+            (now, job_id, job_id),
+        )
+
+    def unfinished(self):
+        return self._query(
+            "SELECT j.priority, j.created_at, u.job_id, u.idx, u.keyword, u.source, u.num_products, u.locations "
+            "FROM job_units u JOIN jobs j ON j.id = u.job_id "
+            "WHERE u.status = 'queued' OR (u.status = 'running' AND u.claimed_at < ?) "
+            "ORDER BY j.created_at, u.idx",
+            (time.time() - JOB_STALE_SECONDS,),
+        )
+
+    def get_job(self, job_id: str):
+        jobs = self._query(
+            'SELECT id, priority, created_at, finished_at, total FROM jobs WHERE id = ?', (job_id,)
+        )
+        if not jobs:
+            return None
+        job = jobs[0]
+        counts = dict(self._query(
+            'SELECT status, COUNT(*) FROM job_units WHERE job_id = ? GROUP BY status', (job_id,)
+        ))
+        return {
+            'job_id': job[0],
+            'priority': job[1],
+            'created_at': job[2],
+            'finished_at': job[3],
+            'status': 'done' if job[3] else ('running' if counts.get('running') or counts.get('done') or counts.get('failed') else 'queued'),
+            'total': job[4],
+            'completed': counts.get('done', 0) + counts.get('failed', 0),
+            'failed': counts.get('failed', 0),
+        }
+
+    def get_results(self, job_id: str, after: int = 0):
+        # Finished units in completion order; poll again with the last `seq` as `after`
+        rows = self._query(
+            'SELECT idx, keyword, source, seq, finished_at, results, error FROM job_units '
+            "WHERE job_id = ? AND status IN ('done', 'failed') AND seq > ? ORDER BY seq",
+            (job_id, after),
+        )
+        return [
+            {
+                'unit': idx,
+                'keyword': keyword,
+                'source': source,
+                'seq': seq,
+                'finished_at': finished_at,
+                # Failed units store null results
+                'results': json.loads(results or 'null') or [],
+                'error': error,
+            }
+            for idx, keyword, source, seq, finished_at, results, error in rows
+        ]
+
+
+class JobQueue:
+    def __init__(self, store: JobStore, crawl, workers: int = JOB_WORKERS):
+        # `crawl(keyword, source, num_products, locations)` is a coroutine returning product dicts
+        self.store = store
+        self.crawl = crawl
+        self.workers = workers
+        self.queue = asyncio.PriorityQueue()
+        self.counter = itertools.count()
+        self.tasks = []
+        # Units waiting in this process's queue, so a rescan does not add them twice
+        self.enqueued = set()
+
+    def _enqueue(self, priority: int, job_id: str, idx: int, unit: dict):
+        if (job_id, idx) in self.enqueued:
+            return
+        self.enqueued.add((job_id, idx))
+        self.queue.put_nowait((priority, next(self.counter), job_id, idx, unit))
+
+    def _enqueue_unfinished(self, rows):
+        # Units queued or running elsewhere may be enqueued here too; `claim` lets only one run
+        for priority, _, job_id, idx, keyword, source, num_products, locations in rows:
+            self._enqueue(priority, job_id, idx, {
+                'keyword': keyword, 'source': source, 'num_products': num_products,
+                'locations': json.loads(locations) if locations else None,
+            })
+
+    def start(self):
+        self._enqueue_unfinished(self.store.unfinished())
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self.tasks.append(asyncio.create_task(self._rescan()))
+
+    async def _rescan(self):
+        # Picks up units left behind by a crashed process without waiting for a restart
+        while True:
+            await asyncio.sleep(JOB_RESCAN_SECONDS)
+            try:
+                self._enqueue_unfinished(await asyncio.to_thread(self.store.unfinished))
+            except Exception as e:
+                print(f"Error rescanning jobs: {e}")
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    async def submit(self, units: list, priority: int) -> str:
+        # SQLite calls run off the event loop: with several worker processes they can wait
+        # on the write lock for up to busy_timeout
+        job_id = uuid.uuid4().hex
+        await asyncio.to_thread(self.store.create_job, job_id, priority, units)
+        for idx, unit in enumerate(units):
+            self._enqueue(priority, job_id, idx, unit)
+        return job_id
+
+    async def _worker(self):
+        while True:
+            _, _, job_id, idx, unit = await self.queue.get()
+            self.enqueued.discard((job_id, idx))
+            try:
+                if not await asyncio.to_thread(self.store.claim, job_id, idx):
+                    continue
+                try:
+                    results = await self.crawl(unit['keyword'], unit['source'], unit['num_products'], unit.get('locations'))
+                except Exception as e:
+                    print(f"Error running job {job_id} unit {idx}: {e}")
+                    await asyncio.to_thread(self.store.finish, job_id, idx, error=str(e) or type(e).__name__)
+                else:
+                    await asyncio.to_thread(self.store.finish, job_id, idx, results=results)
+            finally:
+                self.queue.task_done()
+
+    def stats(self):
+        return {'queued_units': self.queue.qsize(), 'workers': self.workers}
+
+
+async def stream_events(store: JobStore, job_id: str, poll_interval: float = 0.5):
+    # Server-sent events: one `result` event per finished unit, `progress` after each batch,
+    # and a final `done` event when every unit has finished.
+    after = 0
+    while True:
+        job = await asyncio.to_thread(store.get_job, job_id)
+        for result in await asyncio.to_thread(store.get_results, job_id, after):
+            after = result['seq']
+            yield f"event: result\ndata: {json.dumps(result, ensure_ascii=False)}\n\n"
+        yield f"event: progress\ndata: {json.dumps(job)}\n\n"
+        if job['finished_at']:
+            yield f"event: done\ndata: {json.dumps(job)}\n\n"
+            return
+        await asyncio.sleep(poll_interval)
@@ -0,0 +1,60 @@
+import asyncio
+
+# Fields that differ between branches of the same store; everything else is catalog data
+PRICE_KEYS = ('url', 'discountPrice', 'originalPrice', 'quantity')
+
+
+def _key(item: dict):
+    return item.get('id') or item.get('url')
+
+
+def limit_per_location(rows: list, n: int) -> list:
+    # First `n` rows of every location (rows without one count as a single location)
+    counts = {}
+    limited = []
+    for row in rows:
+        location = row.get('location')
+        if counts.get(location, 0) < n:
+            counts[location] = counts.get(location, 0) + 1
+            limited.append(row)
+    return limited
+
+
+async def fetch_locations(crawler_module, keyword: str, num_products: int, locations: list, fetch, submit):
+    # Fan one keyword out across several branches of a store. The first location returns
+    # full catalog rows; the others only re-fetch price and stock (via the crawler's
+    # `fetch_prices` when it has one) and share the catalog fields of the first.
+    # `fetch` runs the (hedged) catalog call, `submit` runs the per-branch calls.
+    locations = list(dict.fromkeys(locations))
+    base_location = locations[0]
+    base = await fetch(crawler_module.fetch_data, keyword, num_products, base_location)
+    if base is None:
+        # The catalog branch failed; report the failure rather than an empty result
+        return None
+    catalog = {_key(item): item for item in base}
+    fetch_prices = getattr(crawler_module, 'fetch_prices', None)
+
+    async def fetch_branch(location: str):
+        if fetch_prices is not None:
+            rows = await submit(fetch_prices, keyword, num_products, location) or []
+        else:
+            rows = await submit(crawler_module.fetch_data, keyword, num_products, location) or []
+
+        merged = []
+        for row in rows:
+            shared = catalog.get(_key(row))
+            if shared is not None:
+                merged.append({**shared, **{k: row[k] for k in PRICE_KEYS if k in row}, 'location': location})
+            elif fetch_prices is None:
+                merged.append({**row, 'location': location})
+            # Price-only rows for items the first branch did not list have no catalog fields; skip them
+        return merged
+
+    results = [{**item, 'location': base_location} for item in base]
+    branches = await asyncio.gather(*(fetch_branch(location) for location in locations[1:]), return_exceptions=True)
+    for location, rows in zip(locations[1:], branches):
+        if isinstance(rows, Exception):
+            print(f"Error fetching location {location}: {rows}")
+            continue
+        results.extend(rows)
+    return results
@@ -0,0 +1,85 @@
+import math
+import os
+import threading
+
+# Adaptive fetch sizing. For every (store, keyword class) we keep a moving average of how many
+# fetched products pass the same keyword pre-filter the client applies (geminiService.ts), and
+# size the next request so the store is expected to return `num_products` relevant ones.
+# Stores with a fixed page (Lottemart always asks for 20, Emart / Farmers Market / 3Sach read
+# one HTML page) are not asked for fewer or more upstream; for them the size only widens the
+# slice of the page that is kept before filtering.
+ADAPTIVE_FETCH = os.environ.get('ADAPTIVE_FETCH', '1') == '1'
+ADAPTIVE_ALPHA = float(os.environ.get('ADAPTIVE_ALPHA', '0.2'))
+ADAPTIVE_MIN_SAMPLES = int(os.environ.get('ADAPTIVE_MIN_SAMPLES', '5'))
+# Never ask a store for more than this multiple of the requested count
+ADAPTIVE_MAX_FACTOR = float(os.environ.get('ADAPTIVE_MAX_FACTOR', '3'))
+# Stores yielding less than this are low priority: fetched at the plain size and never hedged
+ADAPTIVE_LOW_YIELD = float(os.environ.get('ADAPTIVE_LOW_YIELD', '0.1'))
+
+
+def query_words(keyword: str):
+    return keyword.lower().split()
+
+
+def is_relevant(name: str, words: list) -> bool:
+    # Same rule as the client: at least 2 query words in the name, or 1 for one-word queries
+    name = (name or '').lower()
+    min_matches = 2 if len(words) >= 2 else 1
+    return sum(1 for word in words if word in name) >= min_matches
+
+
+def keyword_class(keyword: str) -> str:
+    count = len(query_words(keyword))
+    return '3+' if count >= 3 else str(count)
+
+
+class YieldTracker:
+    def __init__(self):
+        self.yields = {}
+        self.lock = threading.Lock()
+
+    def record(self, source_name: str, keyword: str, fetched: int, relevant: int):
+        if not fetched:
+            return
+        key = (source_name, keyword_class(keyword))
+        ratio = relevant / fetched
+        with self.lock:
+            entry = self.yields.setdefault(key, {'yield': ratio, 'samples': 0, 'fetched': 0, 'relevant': 0})
+            entry['yield'] += ADAPTIVE_ALPHA * (ratio - entry['yield'])
+            entry['samples'] += 1
+            entry['fetched'] += fetched
+            entry['relevant'] += relevant
+
+    def expected_yield(self, source_name: str, keyword: str):
+        with self.lock:
+            entry = self.yields.get((source_name, keyword_class(keyword)))
+            if entry is None or entry['samples'] < ADAPTIVE_MIN_SAMPLES:
+                return None
+            return entry['yield']
+
+    def fetch_size(self, source_name: str, keyword: str, target: int) -> int:
+        expected = self.expected_yield(source_name, keyword)
+        if expected is None or expected < ADAPTIVE_LOW_YIELD:
+            return target
+        return min(math.ceil(target / expected), math.ceil(target * ADAPTIVE_MAX_FACTOR))
+
+    def is_low_priority(self, source_name: str, keyword: str) -> bool:
+        expected = self.expected_yield(source_name, keyword)
+        return expected is not None and expected < ADAPTIVE_LOW_YIELD
+
+    def rank(self, source_names: list, keyword: str) -> list:
+        # Highest expected yield first; stores still learning sit in the middle
+        def score(source_name):
+            expected = self.expected_yield(source_name, keyword)
+            return ADAPTIVE_LOW_YIELD if expected is None else expected
+        return sorted(source_names, key=score, reverse=True)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                f"{source_name}:{klass}": {**entry, 'yield': round(entry['yield'], 3)}
+                for (source_name, klass), entry in self.yields.items()
+            }
+
+
+tracker = YieldTracker()
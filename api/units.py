@@ -0,0 +1,97 @@
+import heapq
+import re
+import unicodedata
+from collections import Counter
+
+# Unit-price normalization. Pack size is parsed from the product name and unit, e.g.
+# "Thùng 48 hộp sữa chua 100g" -> 48 x 100g = 4.8 kg, and the price is divided by it to give a
+# price per kg, per litre or (for counted goods without a weight) per item.
+
+# Measures and their factor to the canonical unit
+MEASURES = {
+    'kg': (1, 'kg'), 'g': (0.001, 'kg'), 'gr': (0.001, 'kg'), 'gram': (0.001, 'kg'),
+    'l': (1, 'l'), 'lít': (1, 'l'), 'lit': (1, 'l'), 'ml': (0.001, 'l'),
+}
+CANONICAL_UNITS = ('kg', 'l', 'item')
+# Words that count pieces inside a pack ("48 hộp", "lốc 4 chai")
+PIECES = ('hộp', 'chai', 'lon', 'gói', 'túi', 'hũ', 'hủ', 'bịch', 'lọ', 'cái', 'quả', 'trái', 'miếng', 'vỉ', 'cây', 'bao')
+
+# "." before exactly three digits groups thousands ("1.000g"); otherwise "." and "," are decimal
+NUMBER = r'(\d{1,3}(?:\.\d{3})+(?![\d.,])|\d+(?:[.,]\d+)?)'
+MEASURE_RE = re.compile(NUMBER + r'\s*(' + '|'.join(sorted(MEASURES, key=len, reverse=True)) + r')(?!\w)')
+COUNT_RE = re.compile(r'(\d+)\s*(?:' + '|'.join(PIECES) + r')(?!\w)')
+# "4 x 180ml" / "48x100g" and "500g x 2"
+TIMES_BEFORE_RE = re.compile(r'(\d+)\s*[x×]\s*(?=\d)')
+TIMES_AFTER_RE = re.compile(r'(?:kg|g|gr|gram|ml|l|lít|lit)\s*[x×]\s*(\d+)(?!\w)')
+# Descriptions such as "1kg (3-4 trái)" or "6-8 quả" give a count that does not multiply the pack
+PARENS_RE = re.compile(r'\([^)]*\)')
+RANGE_RE = re.compile(r'\d+(?:[.,]\d+)?\s*[-–~]\s*\d+(?:[.,]\d+)?')
+
+
+def _number(text: str) -> float:
+    if re.fullmatch(r'\d{1,3}(?:\.\d{3})+', text):
+        return float(text.replace('.', ''))
+    return float(text.replace(',', '.'))
+
+
+def pack_size(name: str, unit: str = None):
+    # (amount, canonical unit) or None when nothing can be parsed
+    text = unicodedata.normalize('NFC', f"{name or ''} {unit or ''}").lower()
+
+    plain = RANGE_RE.sub(' ', PARENS_RE.sub(' ', text))
+
+    # Counts only multiply the measure in a multiplier context: "4 x 180ml", "500ml x 2", or
+    # pieces before the measure ("48 hộp sữa chua 100g"). Without a measure any count is kept.
+    measure = MEASURE_RE.search(plain)
+    before = plain[:measure.start()] if measure else plain
+    count = None
+    for pattern, scope in ((TIMES_BEFORE_RE, plain), (TIMES_AFTER_RE, plain), (COUNT_RE, before)):
+        match = pattern.search(scope)
+        if match:
+            count = int(match.group(1))
+            break
+
+    # A measure only given in parentheses ("Sữa chua (100g)") still counts
+    measure = measure or MEASURE_RE.search(text)
+    if measure:
+        factor, canonical = MEASURES[measure.group(2)]
+        amount = _number(measure.group(1)) * factor * (count or 1)
+        return (amount, canonical) if amount > 0 else None
+
+    # Sold by weight/volume without a number (unit "kg"), or counted goods
+    unit = unicodedata.normalize('NFC', (unit or '').strip().lower())
+    if unit in MEASURES:
+        factor, canonical = MEASURES[unit]
+        return factor, canonical
+    if count or unit in PIECES:
+        return (count or 1), 'item'
+    return None
+
+
+def normalize(items: list) -> list:
+    # Adds `unitPrice` (VND per canonical unit) and `canonicalUnit` to crawler rows in place
+    for item in items:
+        price = item.get('discountPrice') or item.get('originalPrice')
+        size = pack_size(item.get('name'), item.get('unit'))
+        if size and isinstance(price, (int, float)) and price > 0:
+            amount, canonical = size
+            item['unitPrice'] = round(price / amount)
+            item['canonicalUnit'] = canonical
+        else:
+            item['unitPrice'] = None
+            item['canonicalUnit'] = None
+    return items
+
+
+def top_k(products: list, k: int, canonical_unit: str = None, field=getattr):
+    # Cheapest k by unit price without sorting everything. Prices per kg, litre and item are
+    # not comparable, so `canonical_unit` (by default the most common one) ranks first and
+    # the other units, then unparsed products, go last. `field(product, name)` reads a field.
+    if canonical_unit is None:
+        counts = Counter(field(p, 'canonicalUnit') for p in products if field(p, 'canonicalUnit'))
+        canonical_unit = counts.most_common(1)[0][0] if counts else None
+
+    def key(p):
+        unit, price = field(p, 'canonicalUnit'), field(p, 'unitPrice')
+        return (price is None, unit != canonical_unit, unit or '', price or 0)
+    return heapq.nsmallest(k, products, key=key)
@@ -0,0 +1,52 @@
+import asyncio
+import os
+import time
+
+import transport
+
+# Optional keyword for a canary search across every enabled store once connections are warm
+WARMUP_CANARY = os.environ.get('WARMUP_CANARY', '')
+WARMUP_TIMEOUT = float(os.environ.get('WARMUP_TIMEOUT', '10'))
+
+state = {
+    'ready': False,
+    'started_at': None,
+    'duration_ms': None,
+    'hosts': {},
+    'canary': None,
+}
+
+
+async def _warm_host(host: str):
+    start = time.monotonic()
+    try:
+        status = await asyncio.to_thread(transport.warm_connection, host, WARMUP_TIMEOUT)
+        result = {'status': status}
+    except Exception as e:
+        result = {'error': str(e)}
+    result['ms'] = round((time.monotonic() - start) * 1000, 1)
+    return host, result
+
+
+async def warm_up(hosts, canary=None):
+    # `hosts`: store hostnames to resolve and connect to. `canary`: optional coroutine
+    # function taking a keyword, used to run one real search through every crawler.
+    state['started_at'] = time.time()
+    start = time.monotonic()
+
+    results = await asyncio.gather(*(_warm_host(host) for host in set(hosts)))
+    state['hosts'] = dict(results)
+
+    if canary is not None and WARMUP_CANARY:
+        canary_start = time.monotonic()
+        try:
+            count = await asyncio.wait_for(canary(WARMUP_CANARY), WARMUP_TIMEOUT * 3)
+            state['canary'] = {'keyword': WARMUP_CANARY, 'results': count}
+        except Exception as e:
+            state['canary'] = {'keyword': WARMUP_CANARY, 'error': repr(e)}
+        state['canary']['ms'] = round((time.monotonic() - canary_start) * 1000, 1)
+
+    state['duration_ms'] = round((time.monotonic() - start) * 1000, 1)
+    state['ready'] = True
+    print(f"Warm-up finished in {state['duration_ms']} ms")
+    return state
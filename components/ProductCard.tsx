@@ -16,7 +16,7 @@ const ProductCard: React.FC<ProductCardProps> = ({ product }) => {
       <div className="flex items-center gap-4 overflow-hidden">
         {product.image_url ? (
             <div className="relative w-16 h-16 flex-shrink-0">
-                 <img src={product.image_url} alt={product.productTitle} className="w-full h-full object-contain rounded bg-white p-1" />
+                 <img src={product.image_url} alt={product.productTitle} loading="lazy" decoding="async" className="w-full h-full object-contain rounded bg-white p-1" />
             </div>
         ) : (
              <div className="p-3 rounded-full bg-slate-700 text-slate-400">
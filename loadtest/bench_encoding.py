@@ -0,0 +1,104 @@
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import time
+
+import mock_stores
+
+# Compares the default SearchResponse path with the columnar encodings of /api/search:
+#   python loadtest/bench_encoding.py --rows 100,1000,10000 --repeat 20
+# For each result size it reports the median server-side encode time and the payload size,
+# raw and gzipped.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'api'))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import columnar
+import getData
+
+SOURCES = [source_name for _, source_name, _, _ in getData.ENABLED_STORES]
+
+
+def make_rows(n: int, keyword: str = 'sữa chua'):
+    # Rows shaped like run_crawler(..., as_rows=True) output
+    rows = []
+    for i in range(n):
+        price = mock_stores._price(i)
+        rows.append({
+            'name': f"Thùng 48 hộp {mock_stores._name(i, keyword, 0).strip()} 100g",
+            'url': f"https://example.com/{keyword.replace(' ', '-')}-{i}",
+            'image_url': f"/api/image?u=https%3A%2F%2Fcdn.example.com%2F{i}.jpg&s=0123456789abcdef&w=128",
+            'discountPrice': price - 1000 if i % 3 == 0 else None,
+            'originalPrice': price,
+            'unit': 'Thùng',
+            'quantity': float(i % 50),
+            'source': SOURCES[i % len(SOURCES)],
+            'location': None,
+            'unitPrice': round(price / 4.8),
+            'canonicalUnit': 'kg',
+        })
+    return rows
+
+
+def encode_models(keyword: str, rows: list) -> bytes:
+    # What /api/search does today: one Product per row, then FastAPI's response serialization
+    response = getData.SearchResponse(keyword=keyword, results=[getData.Product(**row) for row in rows])
+    return JSONResponse(content=jsonable_encoder(response)).body
+
+
+ENCODERS = {
+    'models': encode_models,
+    'columnar': columnar.encode_json,
+}
+if columnar.USE_ARROW:
+    ENCODERS['arrow'] = columnar.encode_arrow
+
+
+def bench(encode, keyword: str, rows: list, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = encode(keyword, rows)
+        timings.append(time.perf_counter() - start)
+    return {
+        'encode_ms': round(statistics.median(timings) * 1000, 3),
+        'bytes': len(body),
+        'gzip_bytes': len(gzip.compress(body, 6)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark search response encodings')
+    parser.add_argument('--rows', default='100,1000,10000', help='comma separated result sizes')
+    parser.add_argument('--repeat', type=int, default=20, help='encodes per measurement; the median is reported')
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    keyword = 'sữa chua'
+    results = []
+    for n in (int(n) for n in args.rows.split(',')):
+        rows = make_rows(n, keyword)
+        baseline = None
+        for name, encode in ENCODERS.items():
+            result = {'rows': n, 'format': name, **bench(encode, keyword, rows, args.repeat)}
+            if baseline is None:
+                baseline = result
+            result['size_ratio'] = round(result['bytes'] / baseline['bytes'], 3)
+            result['time_ratio'] = round(result['encode_ms'] / baseline['encode_ms'], 3)
+            results.append(result)
+            print(json.dumps(result))
+    if not columnar.USE_ARROW:
+        print("pyarrow not installed, skipped the arrow format")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import socketserver
+import threading
+import time
+
+# Tiny in-memory Redis-protocol stand-in (PING, GET, SET [EX|PX], DEL, FLUSHDB, SELECT) so the
+# redis:// cache backend can be exercised locally, e.g. CACHE_URL=redis://127.0.0.1:6390/0
+
+
+class Store:
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires < time.time():
+                del self.data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self.data[key] = (value, time.time() + ttl if ttl is not None else None)
+
+    def delete(self, keys):
+        with self.lock:
+            return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    def flush(self):
+        with self.lock:
+            self.data.clear()
+
+
+def _bulk(value):
+    return b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+def make_handler(store: Store):
+    class Handler(socketserver.StreamRequestHandler):
+        def _read_command(self):
+            line = self.rfile.readline()
+            if not line:
+                return None
+            if not line.startswith(b'*'):
+                return line.strip().split()
+            args = []
+            for _ in range(int(line[1:-2])):
+                length = int(self.rfile.readline()[1:-2])
+                args.append(self.rfile.read(length + 2)[:-2])
+            return args
+
+        def handle(self):
+            while True:
+                args = self._read_command()
+                if args is None:
+                    return
+                if not args:
+                    continue
+                self.wfile.write(self._dispatch(args[0].upper(), args[1:]))
+
+        def _dispatch(self, command, args):
+            if command == b'PING':
+                return b'+PONG\r\n'
+            if command == b'SELECT':
+                return b'+OK\r\n'
+            if command == b'GET':
+                return _bulk(store.get(args[0]))
+            if command == b'SET':
+                ttl = None
+                options = [a.upper() for a in args[2:]]
+                if b'EX' in options:
+                    ttl = float(args[2 + options.index(b'EX') + 1])
+                elif b'PX' in options:
+                    ttl = float(args[2 + options.index(b'PX') + 1]) / 1000
+                store.set(args[0], args[1], ttl)
+                return b'+OK\r\n'
+            if command == b'DEL':
+                return b':%d\r\n' % store.delete(args)
+            if command == b'FLUSHDB':
+                store.flush()
+                return b'+OK\r\n'
+            return b'-ERR unknown command\r\n'
+
+    return Handler
+
+
+def start(port: int = 0):
+    # Start the stand-in on a background thread and return the server
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', port), make_handler(Store()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve a minimal Redis-protocol cache for local testing')
+    parser.add_argument('--port', type=int, default=6390)
+    args = parser.parse_args()
+    server = start(args.port)
+    print(f"Mock redis listening on redis://127.0.0.1:{server.server_address[1]}/0")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,260 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+# Local stand-ins for every store the crawlers talk to. Requests arrive as
+# /<store host>/<original path>?<query> (see transport.resolve in api/Crawler).
+
+DEFAULTS = {
+    'latency_ms': 150,
+    'jitter_ms': 50,
+    'error_rate': 0.0,
+    'products': 20,
+    'name_padding': 0,
+    'etag': False,
+}
+
+
+def _name(i: int, keyword: str, padding: int) -> str:
+    return f"{keyword} {i} " + ('x' * padding)
+
+
+def _price(i: int) -> int:
+    return 10000 + (i * 1500) % 90000
+
+
+def _vnd(value: int, separator: str) -> str:
+    return f"{value:,}".replace(',', separator) + '₫'
+
+
+def emart(n, keyword, pad):
+    blocks = []
+    for i in range(n):
+        old = f'<span class="price-old">{_vnd(_price(i) + 5000, ".")}</span>' if i % 3 == 0 else ''
+        blocks.append(
+            f'<div class="product-block desktop-pdt"><a href="https://emartmall.com.vn/p/{i}">'
+            f'<img src="https://emartmall.com.vn/img/{i}.jpg"></a><div class="name">{_name(i, keyword, pad)}</div>'
+            f'{old}<span class="price-new">{_vnd(_price(i), ".")}</span></div>'
+        )
+    return 'text/html', f"<html><body>{''.join(blocks)}</body></html>"
+
+
+def farmer(n, keyword, pad):
+    blocks = []
+    for i in range(n):
+        old = f'<span class="price-del">{_vnd(_price(i) + 5000, ",")}</span>' if i % 3 == 0 else ''
+        blocks.append(
+            '<div class="col-lg-2 col-md-4 col-4 product-loop prod-action-small">'
+            f'<a href="/products/{i}"><picture><img data-src="//farmersmarket.vn/img/{i}.jpg"></picture></a>'
+            f'<h3>{_name(i, keyword, pad)}</h3><span class="price">{_vnd(_price(i), ",")}</span>{old}</div>'
+        )
+    return 'text/html', f"<html><body><div class=\"search-list-results\">{''.join(blocks)}</div></body></html>"
+
+
+def three_sach(n, keyword, pad):
+    blocks = []
+    for i in range(n):
+        old = f'<span class="price-del">{_vnd(_price(i) + 5000, ",")}</span>' if i % 3 == 0 else ''
+        blocks.append(
+            '<div class="col-md-2 col-sm-4 col-xs-4 product-loop">'
+            f'<a href="/products/{i}"><picture><source data-srcset="//3sach.vn/img/{i}.jpg"></picture></a>'
+            f'<h3>{_name(i, keyword, pad)}</h3><span class="price">{_vnd(_price(i), ",")}</span>{old}</div>'
+        )
+    return 'text/html', f"<html><body>{''.join(blocks)}</body></html>"
+
+
+def kingfood(n, keyword, pad):
+    edges = [{'node': {'subCate': 'rau-cu', 'variants': [{
+        'slug': f'sp-{i}', 'name': _name(i, keyword, pad), 'discountPrice': _price(i),
+        'originalPrice': _price(i) + 5000, 'stockItem': {'quantity': i}, 'unit': {'name': 'kg'},
+        'thumbnail': f'https://kingfoodmart.com/img/{i}.jpg'}]}} for i in range(n)]
+    return 'application/json', {'data': {'search': {'edges': edges}}}
+
+
+def lotte(n, keyword, pad):
+    items = [{
+        'image_url': f'https://www.lottemart.vn/img/{i}.jpg', 'url_key': f'sp-{i}', 'sku': f'SKU{i}',
+        'name': _name(i, keyword, pad), 'price': {'VND': {'default': _price(i), 'price': _price(i) + 5000}},
+        'custom_attribute': {'unit': 'hộp'}, 'stock_qty': i, 'in_stock': True} for i in range(n)]
+    return 'application/json', {'data': {'items': items}}
+
+
+def mega_market(n, keyword, pad):
+    items = [{
+        'sku': f'SKU{i}', 'small_image': {'url': f'https://online.mmvietnam.com/img/{i}.jpg'},
+        'canonical_url': f'sp-{i}.html', 'name': _name(i, keyword, pad), 'unit_ecom': 'kg', 'stock_status': 'IN_STOCK',
+        'price_range': {'maximum_price': {'regular_price': {'value': _price(i) + 5000}, 'final_price': {'value': _price(i)}}},
+    } for i in range(n)]
+    return 'application/json', {'data': {'products': {'items': items}}}
+
+
+def bach_hoa_xanh(n, keyword, pad):
+    products = [{
+        'avatar': f'https://cdn.tgdd.vn/img/{i}.jpg', 'url': f'/sp-{i}', 'name': _name(i, keyword, pad), 'unit': 'gói',
+        'productPrices': [{'price': _price(i), 'sysPrice': _price(i) + 5000, 'quantity': i}]} for i in range(n)]
+    return 'application/json', {'data': {'products': products}}
+
+
+def kamereo(n, keyword, pad):
+    data = [{
+        'id': i, 'imageUrl': f'https://kamereo.vn/img/{i}.jpg', 'uom': 'kg', 'uomLocal': 'kg', 'name': _name(i, keyword, pad),
+        'price': _price(i), 'originalPrice': _price(i) + 5000, 'inStock': True,
+        'priceV2': {'price': _price(i), 'originalPrice': _price(i) + 5000}} for i in range(n)]
+    return 'application/json', {'data': {'productSearch': {'data': data}}}
+
+
+def win_mart(n, keyword, pad):
+    data = [{
+        'image': f'https://winmart.vn/img/{i}.jpg', 'seoName': f'sp-{i}', 'description': _name(i, keyword, pad),
+        'uomName': 'Hộp', 'price': {'salePrice': _price(i), 'originPrice': _price(i) + 5000},
+        'warehouse': {'availableQuantity': i}} for i in range(n)]
+    return 'application/json', {'data': data}
+
+
+def coop(n, keyword, pad):
+    products = [{
+        'imageUrl': f'https://cooponline.vn/img/{i}.jpg', 'canonical': f'sp-{i}', 'name': _name(i, keyword, pad),
+        'supplierRetailPrice': _price(i) + 5000, 'discountAmount': 5000 if i % 2 else 0, 'uomName': 'Hộp',
+        'totalAvailable': i} for i in range(n)]
+    return 'application/json', {'data': {'products': products}}
+
+
+STORES = {
+    'emartmall.com.vn': emart,
+    'farmersmarket.vn': farmer,
+    '3sach.vn': three_sach,
+    'onelife-api.kingfoodmart.com': kingfood,
+    'www.lottemart.vn': lotte,
+    'online.mmvietnam.com': mega_market,
+    'api.bachhoaxanh.com': bach_hoa_xanh,
+    'buyer-graphql.prod.kamereo.vn': kamereo,
+    'api-crownx.winmart.vn': win_mart,
+    'discovery.tekoapis.com': coop,
+}
+
+
+def _keyword(query: dict, body: bytes) -> str:
+    if 'search' in query:
+        return query['search'][0]
+    if 'q' in query:
+        # Farmers Market wraps the keyword in a filter expression
+        match = re.search(r'contains (.*?)\)', query['q'][0])
+        return match.group(1) if match else query['q'][0]
+    if 'variables' in query:
+        return json.loads(query['variables'][0]).get('inputText') or 'item'
+    try:
+        payload = json.loads(body or b'{}')
+    except ValueError:
+        return 'item'
+    if not isinstance(payload, dict):
+        return 'item'
+    variables = payload.get('variables') or {}
+    return (
+        payload.get('keyword') or payload.get('keywords') or (payload.get('where') or {}).get('query')
+        or variables.get('keyword') or variables.get('inputText') or (variables.get('filter') or {}).get('query')
+        or 'item'
+    )
+
+
+def make_handler(config: dict, per_store: dict):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _serve(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            parts = urlsplit(self.path)
+            host, _, _ = parts.path.lstrip('/').partition('/')
+            query = parse_qs(parts.query)
+
+            render = STORES.get(host)
+            if render is None:
+                return self._reply(404, 'text/plain', b'unknown store')
+
+            settings = {**config, **per_store.get(host, {})}
+            delay = settings['latency_ms'] + random.uniform(-1, 1) * settings['jitter_ms']
+            time.sleep(max(0.0, delay) / 1000)
+            if random.random() < settings['error_rate']:
+                return self._reply(500, 'text/plain', b'mock upstream error')
+
+            content_type, content = render(settings['products'], _keyword(query, body), settings['name_padding'])
+            data = content.encode() if isinstance(content, str) else json.dumps(content, ensure_ascii=False).encode()
+            headers = {}
+            if settings['etag']:
+                etag = f'"{hash(data) & 0xffffffff:x}"'
+                headers['ETag'] = etag
+                if self.headers.get('If-None-Match') == etag:
+                    return self._reply(304, content_type, b'', headers)
+            self._reply(200, content_type, data, headers)
+
+        def _reply(self, status, content_type, data, headers=None):
+            self.send_response(status)
+            self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(data)
+
+        do_GET = _serve
+        do_POST = _serve
+        do_HEAD = _serve
+
+    return Handler
+
+
+def start(port: int = 0, config: dict = None, per_store: dict = None):
+    # Start the stand-in stores on a background thread and return the server
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler({**DEFAULTS, **(config or {})}, per_store or {}))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--latency-ms', type=float, default=DEFAULTS['latency_ms'])
+    parser.add_argument('--jitter-ms', type=float, default=DEFAULTS['jitter_ms'])
+    parser.add_argument('--error-rate', type=float, default=DEFAULTS['error_rate'])
+    parser.add_argument('--products', type=int, default=DEFAULTS['products'], help='products per store response')
+    parser.add_argument('--name-padding', type=int, default=DEFAULTS['name_padding'], help='extra bytes per product name')
+    parser.add_argument('--etag', action='store_true', help='send ETags and answer If-None-Match with 304')
+    parser.add_argument('--store-config', help='JSON file of per-host overrides, e.g. {"www.lottemart.vn": {"latency_ms": 900}}')
+
+
+def config_from_args(args):
+    config = {
+        'latency_ms': args.latency_ms,
+        'jitter_ms': args.jitter_ms,
+        'error_rate': args.error_rate,
+        'products': args.products,
+        'name_padding': args.name_padding,
+        'etag': args.etag,
+    }
+    per_store = {}
+    if args.store_config:
+        with open(args.store_config, encoding='utf-8') as f:
+            per_store = json.load(f)
+    return config, per_store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve mock store APIs and pages for load testing')
+    parser.add_argument('--port', type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+    config, per_store = config_from_args(args)
+    server = start(args.port, config, per_store)
+    print(f"Mock stores listening on http://127.0.0.1:{server.server_address[1]} (set CRAWLER_UPSTREAM to this URL)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
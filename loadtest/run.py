@@ -0,0 +1,207 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import mock_redis
+import mock_stores
+
+# Drives /api/search against a local uvicorn whose crawlers are pointed at the mock stores.
+#   python loadtest/run.py --users 1,5,10,25,50 --duration 20 --latency-ms 200
+# Each stage reports throughput, latency percentiles and the server's peak thread count / RSS.
+# The result cache is off by default so every request reaches the (mock) stores; --cache
+# memory|sqlite|redis measures a cached deployment instead, starting from an empty cache.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(ROOT, 'api')
+
+KEYWORDS = ['sữa chua', 'xoài cát hòa lộc', 'đậu hà lan đà lạt', 'hành lá', 'thùng sữa chua vinamilk ít đường']
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _process_tree(pid: int):
+    pids = [pid]
+    try:
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{task}/children') as f:
+                for child in f.read().split():
+                    pids.extend(_process_tree(int(child)))
+    except OSError:
+        pass
+    return pids
+
+
+def sample_process(pid: int):
+    # (threads, rss_bytes) summed over the server and its worker processes; Linux only
+    threads, rss = 0, 0
+    for p in _process_tree(pid):
+        try:
+            with open(f'/proc/{p}/status') as f:
+                for line in f:
+                    if line.startswith('Threads:'):
+                        threads += int(line.split()[1])
+                    elif line.startswith('VmRSS:'):
+                        rss += int(line.split()[1]) * 1024
+        except OSError:
+            continue
+    return threads, rss
+
+
+async def post_json(host: str, port: int, path: str, payload: dict, timeout: float):
+    body = json.dumps(payload).encode()
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(
+            f'POST {path} HTTP/1.1\r\nHost: {host}:{port}\r\nContent-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body
+        )
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    status = int(response.split(b' ', 2)[1]) if response else 0
+    return status, len(response)
+
+
+def percentile(values, p: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+async def run_stage(args, port: int, pid: int, users: int):
+    latencies, errors, received = [], 0, 0
+    peak_threads, peak_rss = 0, 0
+    deadline = time.monotonic() + args.duration
+    payload_base = {'num_products': args.num_products}
+
+    async def user():
+        nonlocal errors, received
+        while time.monotonic() < deadline:
+            start = time.monotonic()
+            try:
+                status, size = await post_json('127.0.0.1', port, '/api/search',
+                                               {**payload_base, 'keyword': random.choice(KEYWORDS)}, args.timeout)
+                received += size
+                if status != 200:
+                    errors += 1
+            except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+                errors += 1
+                continue
+            latencies.append(time.monotonic() - start)
+            if args.think_ms:
+                await asyncio.sleep(args.think_ms / 1000)
+
+    async def sampler():
+        nonlocal peak_threads, peak_rss
+        while time.monotonic() < deadline:
+            threads, rss = sample_process(pid)
+            peak_threads, peak_rss = max(peak_threads, threads), max(peak_rss, rss)
+            await asyncio.sleep(0.2)
+
+    started = time.monotonic()
+    await asyncio.gather(sampler(), *(user() for _ in range(users)))
+    elapsed = time.monotonic() - started
+    return {
+        'users': users,
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'p50_ms': _ms(percentile(latencies, 0.50)),
+        'p90_ms': _ms(percentile(latencies, 0.90)),
+        'p95_ms': _ms(percentile(latencies, 0.95)),
+        'p99_ms': _ms(percentile(latencies, 0.99)),
+        'max_ms': _ms(max(latencies) if latencies else None),
+        'bytes_received': received,
+        'peak_threads': peak_threads,
+        'peak_rss_mb': round(peak_rss / 2 ** 20, 1),
+        'cache': args.cache,
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def wait_until_up(port: int, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server did not start on port {port}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test /api/search against mock upstream stores')
+    parser.add_argument('--users', default='1,5,10,25,50', help='comma separated virtual user counts, one stage each')
+    parser.add_argument('--duration', type=float, default=15, help='seconds per stage')
+    parser.add_argument('--num-products', type=int, default=10)
+    parser.add_argument('--think-ms', type=float, default=0)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--workers', type=int, default=1, help='uvicorn worker processes')
+    parser.add_argument('--server-env', action='append', default=[], help='extra KEY=VALUE for the server, repeatable')
+    parser.add_argument('--cache', choices=['off', 'memory', 'sqlite', 'redis'], default='off',
+                        help='server result cache; redis uses a local Redis stand-in (default: off)')
+    parser.add_argument('--json', help='write the stage results to this file')
+    mock_stores.add_arguments(parser)
+    args = parser.parse_args()
+
+    config, per_store = mock_stores.config_from_args(args)
+    mock = mock_stores.start(0, config, per_store)
+    upstream = f'http://127.0.0.1:{mock.server_address[1]}'
+
+    port = _free_port()
+    env = {**os.environ, 'CRAWLER_UPSTREAM': upstream}
+    redis = None
+    cache_dir = tempfile.TemporaryDirectory()
+    if args.cache == 'off':
+        env.update({'CACHE_URL': 'memory://', 'CACHE_TTL': '0'})
+    elif args.cache == 'memory':
+        env['CACHE_URL'] = 'memory://'
+    elif args.cache == 'sqlite':
+        env['CACHE_URL'] = 'sqlite:///' + os.path.join(cache_dir.name, 'cache.sqlite3')
+    else:
+        redis = mock_redis.start(0)
+        env['CACHE_URL'] = f'redis://127.0.0.1:{redis.server_address[1]}/0'
+    env.update(item.split('=', 1) for item in args.server_env)
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'getData:app', '--app-dir', API_DIR,
+         '--port', str(port), '--workers', str(args.workers), '--log-level', 'warning'],
+        env=env,
+    )
+    try:
+        wait_until_up(port)
+        results = []
+        for users in (int(u) for u in args.users.split(',')):
+            stage = asyncio.run(run_stage(args, port, server.pid, users))
+            results.append(stage)
+            print(json.dumps(stage, ensure_ascii=False))
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump({'config': vars(args), 'stages': results}, f, indent=2, ensure_ascii=False)
+    finally:
+        server.terminate()
+        server.wait()
+        mock.shutdown()
+        if redis is not None:
+            redis.shutdown()
+        cache_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
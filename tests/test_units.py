@@ -0,0 +1,51 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api'))
+
+import units
+
+
+@pytest.mark.parametrize('name, unit, expected', [
+    # Pieces before the measure multiply it
+    ('Thùng 48 hộp sữa chua 100g', None, (4.8, 'kg')),
+    ('Lốc 4 hộp sữa 180ml', None, (0.72, 'l')),
+    # "N x" and "x N"
+    ('Sữa tươi 4 x 180ml', None, (0.72, 'l')),
+    ('Sữa chua 48x100g', None, (4.8, 'kg')),
+    ('Nước mắm 500ml x 2', None, (1.0, 'l')),
+    # Counts after the measure, in parentheses or in ranges only describe the pack
+    ('Táo Envy 1kg (3-4 trái)', None, (1.0, 'kg')),
+    ('Cam sành 1kg 6-8 quả', None, (1.0, 'kg')),
+    ('Bánh quy 300g 12 gói', None, (0.3, 'kg')),
+    # Decimal comma and point, thousands point
+    ('Dầu ăn 1,5L', None, (1.5, 'l')),
+    ('Gạo 1.5kg', None, (1.5, 'kg')),
+    ('Kem 1.000g', None, (1.0, 'kg')),
+    ('Nước suối 1.500ml', None, (1.5, 'l')),
+    # Measure only in parentheses
+    ('Sữa chua (100g)', None, (0.1, 'kg')),
+    # No measure in the name: the unit field, or a piece count
+    ('Thịt heo xay', 'kg', (1, 'kg')),
+    ('Trứng gà hộp 10 quả', None, (10, 'item')),
+    ('Bắp cải', 'cái', (1, 'item')),
+    ('Rau muống', 'bó', None),
+])
+def test_pack_size(name, unit, expected):
+    size = units.pack_size(name, unit)
+    if expected is None:
+        assert size is None
+    else:
+        assert size[0] == pytest.approx(expected[0])
+        assert size[1] == expected[1]
+
+
+def test_normalize_unit_price():
+    items = units.normalize([
+        {'name': 'Táo Envy 1kg (3-4 trái)', 'unit': None, 'discountPrice': None, 'originalPrice': 120000},
+        {'name': 'Rau muống', 'unit': 'bó', 'discountPrice': 8000, 'originalPrice': 10000},
+    ])
+    assert (items[0]['unitPrice'], items[0]['canonicalUnit']) == (120000, 'kg')
+    assert (items[1]['unitPrice'], items[1]['canonicalUnit']) == (None, None)